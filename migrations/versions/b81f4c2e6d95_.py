@@ -0,0 +1,35 @@
+"""lower() indexes for the admin's case-insensitive prefix search
+
+Revision ID: b81f4c2e6d95
+Revises: e2b94d7a1c53
+Create Date: 2026-10-18 18:20:07.513342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b81f4c2e6d95'
+down_revision = 'e2b94d7a1c53'
+branch_labels = None
+depends_on = None
+
+# indice -> (tabla, columna)
+INDEXES = {
+    'ix_user_username_lower': ('user', 'username'),
+    'ix_user_email_lower': ('user', 'email'),
+    'ix_people_name_lower': ('people', 'name'),
+    'ix_vehicle_name_lower': ('vehicle', 'name'),
+    'ix_planet_name_lower': ('planet', 'name'),
+}
+
+
+def upgrade():
+    for name, (table, column) in INDEXES.items():
+        op.create_index(name, table, [sa.text(f'lower({column})')], unique=False)
+
+
+def downgrade():
+    for name, (table, column) in reversed(list(INDEXES.items())):
+        op.drop_index(name, table_name=table)
@@ -1,20 +1,222 @@
+"""
+Flask-Admin for the API tables, built to stay fast on tables with millions of rows.
+
+The stock ModelView runs an exact COUNT(*) on every list page, pages with OFFSET (the
+database reads and throws away every row before the page) and lets you sort or search on any
+column. LargeTableView instead:
+
+- shows an estimated row count: Postgres' pg_class.reltuples for big tables, an exact count
+  for small ones or other databases; either way cached ADMIN_CACHE_TTL seconds (default 60).
+  With a search or filter there is no count, just next/previous.
+- pages by keyset: the sort key of the last row of each page is cached, so the next page is
+  WHERE (column, id) > (last row) on the index. Jumping straight to a far page falls back
+  to OFFSET once and leaves its boundary cached for the pages after it.
+- only sorts on indexed columns (always with id as tie-break) and searches by prefix on
+  indexed columns: the whole search text, case-insensitive, with the same range + LIKE as
+  ?name__prefix= (see catalog.py) on the lower(column) indexes.
+
+    ADMIN_PAGE_SIZE           rows per list page (default 50)
+    ADMIN_CACHE_TTL           seconds counts and page boundaries are kept (default 60)
+    ADMIN_EXACT_COUNT_LIMIT   tables estimated below this many rows get an exact count (default 10000)
+    ADMIN_READ_DATABASE_URL   list pages and exports read from this database (default
+                              REPLICA_DATABASE_URL, on the same engine as the API's replica
+                              bind, see replica.py); forms, edits and deletes always use the primary
+"""
 import os
-from flask_admin import Admin
-from models import db, User, People, Vehicle, Planet, Favourite
+import zlib
+from flask import jsonify, request
+from flask_admin import Admin, BaseView, expose
 from flask_admin.contrib.sqla import ModelView
+from sqlalchemy import create_engine, func, or_, select, text
+from sqlalchemy.orm import configure_mappers, scoped_session, sessionmaker
+from cache import cache
+from catalog import prefix_condition
+from models import db, User, People, Vehicle, Planet, Favourite
+from pool import pool_stats, engine_options_from_env
+from replica import replica, BIND_KEY
+from utils import keyset_condition
+
+PAGE_SIZE = int(os.getenv("ADMIN_PAGE_SIZE", 50))
+CACHE_TTL = int(os.getenv("ADMIN_CACHE_TTL", 60))
+EXACT_COUNT_LIMIT = int(os.getenv("ADMIN_EXACT_COUNT_LIMIT", 10000))
+
+
+def estimate_count(session, model):
+    """Rows in the model's table: planner statistics on Postgres, COUNT(*) when they are small or missing."""
+    table = model.__table__
+    key = f"admin:count:{table.name}"
+    count = cache.backend.get(key)
+    if count is not None:
+        return count
+    bind = session.get_bind()
+    if bind.dialect.name == "postgresql":
+        # reltuples es -1 mientras la tabla no tenga ANALYZE (Postgres 14+)
+        quoted = bind.dialect.identifier_preparer.format_table(table)
+        count = session.execute(text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+                                {"table": quoted}).scalar()
+    if count is None or count < EXACT_COUNT_LIMIT:
+        count = session.execute(select(func.count()).select_from(table)).scalar()
+    cache.backend.set(key, count, CACHE_TTL)
+    return count
+
+
+class LargeTableView(ModelView):
+    """ModelView with estimated counts, keyset paging and index-only sort/search (see module docstring)."""
+
+    page_size = PAGE_SIZE
+    can_set_page_size = True
+    # el COUNT(*) lo reemplaza estimate_count() en get_list
+    simple_list_pager = True
+    column_display_pk = True
+    column_default_sort = ("id", False)
+    # la relacion favourites cargaria la tabla de favoritos entera en el formulario
+    form_excluded_columns = ("favourites", "favourite_count")
+
+    def __init__(self, model, session, read_session=None, **kwargs):
+        self.read_session = read_session
+        super().__init__(model, session, **kwargs)
+
+    def _reads_from_replica(self):
+        return self.read_session is not None and request.endpoint in (
+            f"{self.endpoint}.index_view", f"{self.endpoint}.export")
+
+    def get_query(self):
+        if self._reads_from_replica():
+            return self.read_session.query(self.model)
+        return super().get_query()
+
+    def get_count_query(self):
+        if self._reads_from_replica():
+            return self.read_session.query(func.count("*")).select_from(self.model)
+        return super().get_count_query()
+
+    def _apply_search(self, query, count_query, joins, count_joins, search):
+        # por prefijo, no ILIKE '%term%': el de flask-admin recorre la tabla entera.
+        # el texto entero es un solo prefijo ("Luke Sky"), sobre lower(columna) que tiene su indice
+        term = search.strip().lower()
+        if not term:
+            return query, count_query, joins, count_joins
+        condition = or_(*[prefix_condition(func.lower(column), term) for column, path in self._search_fields])
+        query = query.filter(condition)
+        if count_query is not None:
+            count_query = count_query.filter(condition)
+        return query, count_query, joins, count_joins
+
+    def _boundary_key(self, sort_column, sort_desc, search, filters, page_size, page):
+        args = repr((sort_column, bool(sort_desc), search, filters, page_size))
+        return f"admin:page:{self.endpoint}:{zlib.crc32(args.encode()):08x}:{page}"
+
+    def get_list(self, page, sort_column, sort_desc, search, filters, execute=True, page_size=None):
+        page = page or 0
+        page_size = page_size or self.page_size
+        # sin limit ni offset: los filtros del keyset van antes del LIMIT
+        count, query = super().get_list(None, sort_column, sort_desc, search, filters, execute=False, page_size=0)
+        if not search and not filters:
+            count = estimate_count(self.get_query().session, self.model)
+
+        model = self.model
+        if sort_column in self.column_sortable_list and sort_column != "id":
+            order = [(getattr(model, sort_column), bool(sort_desc)), (model.id, bool(sort_desc))]
+            # desempate por id, asi el orden es total y el indice (columna, id) sirve tal cual
+            query = query.order_by(model.id.desc() if sort_desc else model.id.asc())
+        else:
+            order = [(model.id, bool(sort_desc) if sort_column == "id" else False)]
+
+        boundary = None
+        if page:
+            boundary = cache.backend.get(self._boundary_key(sort_column, sort_desc, search, filters, page_size, page - 1))
+        if boundary is not None:
+            query = query.filter(keyset_condition(order, boundary))
+        elif page:
+            query = query.offset(page * page_size)
+        query = query.limit(page_size)
+        if not execute:
+            return count, query
+
+        rows = query.all()
+        if rows:
+            last = [getattr(rows[-1], column.key) for column, descending in order]
+            # con NULL en la clave no hay comparacion posible: esa pagina sigue con OFFSET
+            if None not in last:
+                cache.backend.set(self._boundary_key(sort_column, sort_desc, search, filters, page_size, page),
+                                  last, CACHE_TTL)
+        return count, rows
+
+
+class UserView(LargeTableView):
+    # username y email son unique, ya tienen indice
+    column_sortable_list = ("id", "username", "email")
+    column_searchable_list = ("username", "email")
+    column_exclude_list = ("password",)
+
+
+def catalog_view(model):
+    """LargeTableView for People/Planet/Vehicle, sorting and searching only on the indexed FILTER_FIELDS."""
+    return type(f"{model.__name__}View", (LargeTableView,), {
+        "column_sortable_list": ("id",) + model.FILTER_FIELDS + ("favourite_count",),
+        "column_searchable_list": ("name",),
+    })
+
+
+class FavouriteView(LargeTableView):
+    # las columnas de id en vez de las relaciones: nada de un SELECT por fila para mostrar el target
+    column_list = ("id", "id_user", "id_peoples", "id_planets", "id_vehicles", "name")
+    # id_user encabeza los indices unicos (id_user, id_...)
+    column_sortable_list = ("id", "id_user")
+    column_filters = ("id_user",)
+    # los selects de usuario y target buscan por ajax en vez de listar las tablas enteras
+    form_ajax_refs = {
+        "user": {"fields": ("email",)},
+        "people": {"fields": ("name",)},
+        "planet": {"fields": ("name",)},
+        "vehicle": {"fields": ("name",)},
+    }
+
+
+class PoolStatsView(BaseView):
+    # estadisticas en vivo del pool de conexiones de este worker: /admin/pool/
+    # (montado en la API el admin usa sus engines, ver factory.share_engines)
+    @expose('/')
+    def index(self):
+        return jsonify(pool_stats(db.engine))
+
+
+def read_session_from_env(app):
+    """Session on ADMIN_READ_DATABASE_URL (or the API's replica) for the list pages, None to read from the primary."""
+    read_url = os.getenv("ADMIN_READ_DATABASE_URL")
+    if read_url:
+        read_url = read_url.replace("postgres://", "postgresql://")
+        engine = create_engine(read_url, **engine_options_from_env(read_url))
+    elif replica.enabled:
+        # el bind "replica" de db, no otro pool contra la misma base
+        with app.app_context():
+            engine = db.engines[BIND_KEY]
+    else:
+        return None
+    read_session = scoped_session(sessionmaker(bind=engine))
+
+    @app.teardown_appcontext
+    def remove_read_session(exception=None):
+        read_session.remove()
+
+    return read_session
+
 
-def setup_admin(app):
+def setup_admin(app, url='/admin'):
     app.secret_key = os.environ.get('FLASK_APP_KEY', 'sample key')
     app.config['FLASK_ADMIN_SWATCH'] = 'cerulean'
-    admin = Admin(app, name='4Geeks Admin', template_mode='bootstrap3')
+    admin = Admin(app, name='4Geeks Admin', template_mode='bootstrap3', url=url)
+    read_session = read_session_from_env(app)
+    # los backref (Favourite.user, .people...) recien existen con los mappers configurados
+    configure_mappers()
 
-    
     # Add your models here, for example this is how we add a the User model to the admin
-    admin.add_view(ModelView(User, db.session))
-    admin.add_view(ModelView(People, db.session))
-    admin.add_view(ModelView(Vehicle, db.session))
-    admin.add_view(ModelView(Planet, db.session))
-    admin.add_view(ModelView(Favourite, db.session))
+    admin.add_view(UserView(User, db.session, read_session))
+    admin.add_view(catalog_view(People)(People, db.session, read_session))
+    admin.add_view(catalog_view(Vehicle)(Vehicle, db.session, read_session))
+    admin.add_view(catalog_view(Planet)(Planet, db.session, read_session))
+    admin.add_view(FavouriteView(Favourite, db.session, read_session))
+    admin.add_view(PoolStatsView(name='Pool', endpoint='pool'))
 
     # You can duplicate that line to add mew models
-    # admin.add_view(ModelView(YourModelName, db.session))
\ No newline at end of file
+    # admin.add_view(LargeTableView(YourModelName, db.session))
@@ -0,0 +1,9 @@
+# Flask-Admin alone, for running it in its own process with ADMIN_MODE=off in the API workers:
+#   gunicorn admin_wsgi --chdir ./src/ -b 0.0.0.0:3001
+
+from factory import create_admin_app
+
+application = create_admin_app()
+
+if __name__ == "__main__":
+    application.run()
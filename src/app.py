@@ -1,301 +1,376 @@
 """
 This module takes care of starting the API Server, Loading the DB and Adding the endpoints
-"""
-import os
-from flask import Flask, request, jsonify, url_for
-from flask_migrate import Migrate
-from flask_swagger import swagger
-from flask_cors import CORS
-from utils import APIException, generate_sitemap
-from admin import setup_admin
-from models import db, User, People, Vehicle, Planet, Favourite
-#from models import Person
 
-from flask_jwt_extended import create_access_token, get_jwt_identity, jwt_required, JWTManager
+create_app() builds the application and `app` (at the end of the file) is the instance that
+wsgi.py, asgi.py and the `flask` command use. ADMIN_MODE decides when Flask-Admin is loaded:
 
-app = Flask(__name__)
-app.url_map.strict_slashes = False
+    lazy   (default) /admin is built on its first request, worker boot doesn't pay for it
+    eager  built together with the API, in every worker
+    off    no admin in this process; run it apart with admin_wsgi.py
 
-# Setup the Flask-JWT-Extended extension
-app.config["JWT_SECRET_KEY"] = "super-secret"  # Change this!
-jwt = JWTManager(app)
-
-db_url = os.getenv("DATABASE_URL")
-if db_url is not None:
-    app.config['SQLALCHEMY_DATABASE_URI'] = db_url.replace("postgres://", "postgresql://")
-else:
-    app.config['SQLALCHEMY_DATABASE_URI'] = "sqlite:////tmp/test.db"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+configure() and the admin app live in factory.py, which admin_wsgi.py imports without this module.
 
+Alembic (Flask-Migrate) and the CLI commands are only loaded when running the `flask` command.
+"""
+import os
+import time
+import zlib
+from flask import Flask, request, jsonify, current_app
+from flask_cors import CORS
+from sqlalchemy import or_, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
+from utils import APIException, generate_sitemap, route_catalog, list_response, get_one
+from catalog import register_catalog
+from instrumentation import setup_instrumentation, timed
+from cache import cache, favourites_version_key, matching_etag
+from security import hash_password, verify_password, needs_rehash
+from logger import log, setup_logging
+from compression import setup_compression
+from auth import setup_auth
+from ratelimit import limiter, by_ip, by_user_id, by_login_email
+from replica import replica, BIND_KEY
+from factory import configure, create_admin_app, LazyWSGIApp
+from models import db, User, Favourite, FAVOURITE_TARGETS, insert_favourites, delete_favourites, change_favourite_counts
+from leaderboard import refresh_counts
+#from models import Person
 
-MIGRATE = Migrate(app, db)
-db.init_app(app)
-CORS(app)
-setup_admin(app)
+from flask_jwt_extended import create_access_token, current_user, get_jwt_identity, jwt_required, JWTManager
+
+# vistas de este modulo: create_app() las agrega a cada app que construye
+ROUTES = []
+
+
+def route(rule, auth=False, **options):
+    """Same as @app.route, for the app built by create_app(). auth=True goes with @jwt_required(), for /routes."""
+    def decorator(view):
+        ROUTES.append((rule, view, auth, options))
+        return view
+    return decorator
+
+
+def create_app(admin_mode=None):
+    app = Flask(__name__)
+    configure(app)
+
+    jwt = JWTManager(app)
+    # current_user sale de un cache por identidad, sin query a User en cada request (ver auth.py)
+    setup_auth(jwt)
+
+    cache.init_app(app)
+    # token buckets para login, signup y escrituras de favoritos (ver ratelimit.py)
+    limiter.init_app(app)
+    CORS(app)
+
+    admin_mode = admin_mode or os.getenv("ADMIN_MODE", "lazy")
+    if admin_mode == "eager":
+        from admin import setup_admin
+        setup_admin(app)
+    elif admin_mode == "lazy":
+        # /admin/... lo atiende una app aparte, construida en su primer request
+        app.wsgi_app = DispatcherMiddleware(app.wsgi_app, {"/admin": LazyWSGIApp(lambda: create_admin_app(url="/", api_app=app))})
+
+    setup_instrumentation(app)
+    if os.environ.get("FLASK_RUN_FROM_CLI") == "true":
+        # flask db ... y los comandos de commands.py; un worker de gunicorn no los necesita
+        from flask_migrate import Migrate
+        from commands import setup_commands
+        Migrate(app, db)
+        setup_commands(app)
+    setup_logging(app)
+    # gzip/brotli segun Accept-Encoding (ver compression.py)
+    setup_compression(app)
+
+    app.register_error_handler(APIException, handle_invalid_usage)
+
+    # PEOPLE 👨‍👩‍👧‍👦, PLANETS 🪐 y VEHICLES 🚗: listas, detalle y favoritos (ver catalog.py)
+    register_catalog(app, "people", "/people", "people", "People", "These are the People from Star Wars")
+    register_catalog(app, "planet", "/planets", "planets", "Planet", "These are the Planets from Star Wars")
+    register_catalog(app, "vehicle", "/vehicles", "vehicles", "Vehicle", "These are the Vehicles from Star Wars")
+
+    auth_endpoints = set()
+    for rule, view, auth, options in ROUTES:
+        app.add_url_rule(rule, view_func=view, **options)
+        if auth:
+            auth_endpoints.add(options.get("endpoint", view.__name__))
+
+    # indice de rutas calculado una sola vez: / y /routes no recorren el url_map en cada request
+    sitemap_html = generate_sitemap(app, admin=admin_mode != "off")
+    catalog_json = app.json.dumps({"msg": "These are the routes of this API", "results": route_catalog(app, auth_endpoints)})
+    app.extensions["route_index"] = {
+        "html": (sitemap_html, f"{zlib.crc32(sitemap_html.encode()):x}"),
+        "json": (catalog_json, f"{zlib.crc32(catalog_json.encode()):x}"),
+    }
+    return app
 
 # Handle/serialize errors like a JSON object
-@app.errorhandler(APIException)
 def handle_invalid_usage(error):
     return jsonify(error.to_dict()), error.status_code
 
+def route_index_response(kind, mimetype):
+    body, etag = current_app.extensions["route_index"][kind]
+    matched = matching_etag(etag)
+    if matched is not None:
+        response = current_app.response_class(status=304)
+        response.set_etag(matched)
+        return response
+    response = current_app.response_class(body, mimetype=mimetype)
+    response.set_etag(etag)
+    return response
+
 # generate sitemap with all your endpoints
-@app.route('/')
+@route('/')
 def sitemap():
-    return generate_sitemap(app)
+    return route_index_response("html", "text/html")
+
+# ROUTES 🗺️ catalogo de rutas en JSON: metodos, parametros y si piden token
+@route('/routes', methods=['GET'])
+def get_routes():
+    return route_index_response("json", "application/json")
+
+# HEALTH ❤️ /healthz: el proceso responde (sin base de datos), para el balanceador
+@route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify({"status": "ok"}), 200
+
+# /readyz: ademas la base de datos contesta
+@route('/readyz', methods=['GET'])
+def readyz():
+    start = time.perf_counter()
+    try:
+        db.session.execute(text("SELECT 1"))
+    except SQLAlchemyError as error:
+        db.session.rollback()
+        log.warning("readiness check failed", extra={"error": type(error).__name__})
+        return jsonify({"status": "unavailable", "database": type(error).__name__}), 503
+    response_body = {"status": "ready", "database": "ok",
+                     "database_ms": round((time.perf_counter() - start) * 1000, 2)}
+    if replica.enabled:
+        # una replica caida o atrasada no saca al worker de servicio: las lecturas van al primary
+        response_body["replica"] = replica.status(db.engines[BIND_KEY])
+    return jsonify(response_body), 200
 
 # Endpoints # Poner servidor en publico, sino no funciona mister postman
 
 # [GET] /people Listar todos los registros de people en la base de datos✅
+#       ?after_id=&limit= para paginar, ?stream=true para exportar la tabla entera
 # [GET] /people/<int:people_id> Listar la información de una sola people ✅
+#       listas y detalle aceptan ?fields=id,name para traer solo esas columnas
+#       /people, /planets y /vehicles filtran y ordenan: ?climate=arid&population__gte=1000&name__prefix=Ta&sort=-population
 # [GET] /planets Listar los registros de planets en la base de datos ✅
 # [GET] /planets/<int:planet_id> Listar la información de un solo planet ✅
+# [GET] /vehicles y /vehicles/<int:vehicle_id> igual que people y planets ✅
+# [GET] /people/<int:people_id>/favourite-count cuantos usuarios lo tienen en favoritos (igual en planets y vehicles) ✅
+# [GET] /people/leaderboard?limit=10 los mas favoritos, desde memoria (ver leaderboard.py) ✅
 # [GET] /users Listar todos los usuarios del blog ✅
 # [GET] /users/favorites Listar todos los favoritos que pertenecen al usuario actual. ✅
-
-# ALL PEOPLE 👨‍👩‍👧‍👦
-@app.route('/people', methods=['GET'])
-def get_people():
-    people_query = People.query.all()
-    results = list(map(lambda item: item.serialize(), people_query))
-    print("result people: ", results)
-    response_body = { "msg": "These are the People from Star Wars",
-                     "results": results}
-    
-    return jsonify(response_body), 200
-
-# ONE PEOPLE 👨‍💼
-@app.route('/people/<int:people_id>', methods=['GET'])
-def get_one_people(people_id):
-    one_people = People.query.filter_by(id=people_id).first()
-
-    if not one_people:
-        return jsonify({"msg": "People not found"}), 404
-
-    response_body = { "msg": "This is the one you are looking for",
-                     "results": one_people.serialize()}
-    
-    return jsonify(response_body), 200
-
-
-# ALL PLANETS 🪐🪐🪐
-@app.route('/planets', methods=['GET'])
-def get_planets():
-    planet_query = Planet.query.all()
-    results = list(map(lambda item: item.serialize(), planet_query))
-    print("result planet: ", results)
-    response_body = { "msg": "These are the Planets from Star Wars",
-                     "results": results}
-    
-    return jsonify(response_body), 200
-
-# ONE PLANET 🪐
-@app.route('/planets/<int:planet_id>', methods=['GET'])
-def get_one_planet(planet_id):
-    one_planet = Planet.query.filter_by(id=planet_id).first()
-
-    if not one_planet:
-        return jsonify({"msg": "Planet not found"}), 404
-    
-    response_body = { "msg": "This is the one you are looking for",
-                     "results": one_planet.serialize()}
-    
-    return jsonify(response_body), 200
-
+# (people, planets y vehicles se registran con register_catalog en create_app)
 
 # ALL USERS 👥
-@app.route('/users', methods=['GET'])
+@route('/users', methods=['GET'])
+@cache.conditional("user")
+@replica.read_only("user")
 def get_users():
-    user_query = User.query.all()
-    results = list(map(lambda item: item.serialize(), user_query))
-    print("result user: ", results)
-    response_body = { "msg": "These are the users",
-                     "results": results}
-    
-    return jsonify(response_body), 200
+    # paginado por id: ?after_id=<ultimo id recibido>&limit=<n>, o ?stream=true para exportar todo
+    return list_response(User, "These are the users")
 
 # ONE USER 👤
-@app.route('/users/<int:user_id>', methods=['GET'])
+@route('/users/<int:user_id>', methods=['GET'])
+@cache.conditional("user")
+@replica.read_only("user")
 def get_one_user(user_id):
-    one_user = User.query.filter_by(id=user_id).first()
+    one_user, serialize = get_one(User, user_id)
 
     if not one_user:
         return jsonify({"msg": "User not found"}), 404
     
     response_body = { "msg": "This is the one you are looking for",
-                     "results": one_user.serialize()}
+                     "results": serialize(one_user)}
     
     return jsonify(response_body), 200
 
 # USER FAVOURITE 🎇🎇🎇
-@app.route('/users/<int:user_id>/favourites', methods=['GET'])
+@route('/users/<int:user_id>/favourites', methods=['GET'], auth=True)
 @jwt_required()
 def get_user_favourite(user_id):
     # .all() obtiene todos
     # .first() obtiene el primero
 
-    # forma .get para obtener user
-    user = User.query.get(user_id)
-
-    if not user:
-        return jsonify({"msg": "User not found"}), 404
-    
-    # tomamos el id del token generado y lo comparamos con el user_id que viene
-    current_user_id = get_jwt_identity()
-
+    # current_user es el usuario del token (activo), cargado por auth.py: no hace falta buscarlo otra vez
     # Verifica si el usuario actual coincide con el usuario solicitado
-    if current_user_id != user.id:
+    if current_user.id != user_id:
         return jsonify({"msg": "You don't have user favorites permission"}), 403
 
-    favourites_list = Favourite.query.filter_by(id_user=user_id).all() # lista de objetos con los id de los fav
-    print("TEST favourite user list: ",favourites_list)
-    serialized_favourites = []
+    # If-None-Match: si el cliente ya tiene esta version respondemos 304 sin tocar la base de datos
+    etag, not_modified = cache.check_etag(("people", "planet", "vehicle", favourites_version_key(user_id)))
+    if not_modified is not None:
+        return not_modified
+
+    # joinedload trae people, planet y vehicle en el mismo SELECT (evita un query extra por cada favorito)
+    favourites_list = Favourite.query.options(
+        joinedload(Favourite.people),
+        joinedload(Favourite.planet),
+        joinedload(Favourite.vehicle),
+    ).filter_by(id_user=user_id).all() # lista de objetos con los id de los fav
+    log.debug("favourites loaded", extra={"user_id": user_id, "count": len(favourites_list)})
 
     if not favourites_list:
         return jsonify({"msg": "User not found"}), 204 # 204 para no contenido, si esta vacia
 
     # iteramos la lista de favoritos para obtener los objetos serializados de cada entidad, si es que tiene
-    for fav in favourites_list:
-        serialized_fav = fav.serialize()   
-        print(serialized_fav)
-        if fav.id_peoples:
-            serialized_fav["people"] = fav.people.serialize()
-        if fav.id_planets:
-            serialized_fav["planet"] = fav.planet.serialize()
-        if fav.id_vehicles:
-            serialized_fav["vehicle"] = fav.vehicle.serialize()
-        
-        serialized_favourites.append(serialized_fav)
+    with timed("serialize"):
+        serialized_favourites = [fav.serialize_with_target() for fav in favourites_list]
 
     response_body = {
         "msg": f"Favourites de usario: {user_id}",
         "results": serialized_favourites
     }
-              
-    return jsonify(response_body), 200
+
+    response = jsonify(response_body)
+    response.set_etag(etag)
+    return response, 200
 
 # [POST] /favorite/planet/<int:planet_id> Añade un nuevo planet favorito al usuario actual con el planet id = planet_id.✅
 # [POST] /favorite/people/<int:people_id> Añade una nueva people favorita al usuario actual con el people.id = people_id.✅
 # [DELETE] /favorite/planet/<int:planet_id> Elimina un planet favorito con el id = planet_id`.✅
 # [DELETE] /favorite/people/<int:people_id> Elimina una people favorita con el id = people_id.✅
+# [POST/DELETE] .../favourites/vehicle/<int:vehicle_id> lo mismo para vehicles ✅
+# (los add/delete de cada entidad se registran con register_catalog, arriba)
 
-# ADD FAVOURITE PLANET 🎇🪐
-@app.route('/users/<int:user_id>/favourites/planet/<int:planet_id>', methods=['POST'])
-def add_user_favourite_planet(user_id, planet_id):
-    # user exist ?
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({"msg": "User not found"}), 404
+# un batch gasta un solo token del rate limit: acota los INSERT/DELETE y el tamaño de los IN
+MAX_BATCH_OPERATIONS = 100
 
-    # planet exist ?
-    planet = Planet.query.get(planet_id)
-    if planet:
-        # planet exist in user-favourite?
-        existing_favourite = Favourite.query.filter_by(id_user=user_id, id_planets=planet_id).first()
-        if existing_favourite:
-            return jsonify({"msg": "Planet already in user's favourites"}), 400       
-        else:
-            # Agrega el nuevo favorito a la base de datos
-            new_favourite_planet = Favourite(name="Nombre del favorito", 
-                                    id_user=user_id, 
-                                    id_peoples=None, 
-                                    id_planets=planet_id, 
-                                    id_vehicles=None
-                                    )
-            
-            db.session.add(new_favourite_planet)
-            db.session.commit()
-
-            return jsonify({"msg": f"Planeta {planet_id} se agrego a favoritos del usuario {user_id} "}), 201
-
-    return jsonify({"msg": "No se pudo agregar nada"}), 404
-
-# ADD FAVOURITE PEOPLE 🎇👨‍💼
-@app.route('/users/<int:user_id>/favourites/people/<int:people_id>', methods=['POST'])
-def add_user_favourite_people(user_id, people_id):
-    # user exist ?
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({"msg": "User not found"}), 404
+def is_target_id(value):
+    # True/False son int en Python, pero no son un id
+    return isinstance(value, int) and not isinstance(value, bool)
 
-    # people exist ?
-    people = People.query.get(people_id)
-    if people:
-        # people exist in user-favourite?
-        existing_favourite = Favourite.query.filter_by(id_user=user_id, id_peoples=people_id).first()
-        if existing_favourite:
-            return jsonify({"msg": "People already in user's favourites"}), 400
-            # Agrega el nuevo favorito a la base de datos
-        else:
-            new_favourite_people = Favourite(name="Nombre del favorito", 
-                                    id_user=user_id, 
-                                    id_peoples=people_id, 
-                                    id_planets=None, 
-                                    id_vehicles=None
-                                    )
-            
-            db.session.add(new_favourite_people)
-            db.session.commit()
-
-            return jsonify({"msg": f"People {people_id} se agrego a favoritos del usuario {user_id} "}), 201
-
-    return jsonify({"msg": "No se pudo agregar nada"}), 404
-
-# DELETE FAVORITE PEOPLE FROM USER ❌🎇👨‍💼
-@app.route('/users/<int:user_id>/favourites/people/<int:people_id>', methods=['DELETE'])
-def delete_user_favourite_people(user_id, people_id):
-    # user exist ?
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({"msg": "User not found"}), 404
+# BULK FAVOURITES 🎇🎇 añade/elimina muchos favoritos en una sola transaccion
+# body: {"operations": [{"action": "add" | "remove", "type": "people" | "planet" | "vehicle", "id": 1}, ...]}
+@route('/users/<int:user_id>/favourites/batch', methods=['POST'], auth=True)
+@jwt_required()
+@limiter.limit("favourites_ip", by_ip)
+@limiter.limit("favourites_identity", by_user_id)
+def batch_user_favourites(user_id):
+    # solo el dueño del token modifica sus favoritos
+    if current_user.id != user_id:
+        return jsonify({"msg": "You don't have user favorites permission"}), 403
 
-    # people exist ?
-    people = People.query.get(people_id)
-    if people:
-        # people exist in user-favourite?
-        existing_favourite = Favourite.query.filter_by(id_user=user_id, id_peoples=people_id).first()
-        if existing_favourite:
-            db.session.delete(existing_favourite)
-            db.session.commit()
-            return jsonify({"msg": f"People {people_id} removed from user's favorites {user_id}"}), 200
+    request_body = request.get_json(force=True, silent=True) or {}
+    operations = request_body.get("operations")
+    if not isinstance(operations, list) or not operations:
+        raise APIException("operations must be a non empty list", status_code=400)
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise APIException(f"At most {MAX_BATCH_OPERATIONS} operations per batch", status_code=400)
+
+    # current_user ya garantiza que el usuario existe y esta activo (ver auth.py)
+    # ids pedidos por tipo, para validar con un solo IN por entidad
+    requested = {fav_type: set() for fav_type in FAVOURITE_TARGETS}
+    for op in operations:
+        if isinstance(op, dict) and op.get("type") in FAVOURITE_TARGETS and is_target_id(op.get("id")):
+            requested[op["type"]].add(op["id"])
+
+    existing_targets = {}
+    for fav_type, ids in requested.items():
+        model = FAVOURITE_TARGETS[fav_type][0]
+        existing_targets[fav_type] = {row.id for row in db.session.query(model.id).filter(model.id.in_(ids))} if ids else set()
+
+    # favoritos actuales del usuario para esos ids: (tipo, id) -> id del Favourite, en un solo SELECT
+    current = {}
+    conditions = [getattr(Favourite, column).in_(requested[fav_type]) for fav_type, (model, column) in FAVOURITE_TARGETS.items() if requested[fav_type]]
+    if conditions:
+        rows = db.session.query(Favourite.id, Favourite.id_peoples, Favourite.id_planets, Favourite.id_vehicles).filter(Favourite.id_user == user_id, or_(*conditions))
+        for row in rows:
+            for fav_type, (model, column) in FAVOURITE_TARGETS.items():
+                target_id = getattr(row, column)
+                if target_id is not None:
+                    current[(fav_type, target_id)] = row.id
+
+    # (tipo, id) -> fila a insertar / id del Favourite a borrar, con el resultado que hay que corregir
+    # si otro request se adelanta (el indice unico descarta el INSERT, el DELETE no encuentra la fila)
+    to_insert = {}
+    to_delete = {}
+    results = []
+    for index, op in enumerate(operations):
+        if not isinstance(op, dict):
+            results.append({"index": index, "status": "invalid"})
+            continue
+        action = op.get("action", "add")
+        fav_type = op.get("type")
+        target_id = op.get("id")
+        result = {"index": index, "action": action, "type": fav_type, "id": target_id}
+        results.append(result)
+
+        if action not in ("add", "remove") or fav_type not in FAVOURITE_TARGETS or not is_target_id(target_id):
+            result["status"] = "invalid"
+        elif target_id not in existing_targets[fav_type]:
+            result["status"] = "not_found"
+        elif action == "add":
+            if (fav_type, target_id) in current:
+                result["status"] = "already_exists"
+            else:
+                row = {"name": "Nombre del favorito", "id_user": user_id, "id_peoples": None, "id_planets": None, "id_vehicles": None}
+                row[FAVOURITE_TARGETS[fav_type][1]] = target_id
+                to_insert[(fav_type, target_id)] = (row, result)
+                # marcamos como existente por si la misma operacion viene repetida en el batch
+                current[(fav_type, target_id)] = None
+                result["status"] = "added"
         else:
-            return jsonify({"msg": "People no exist in user's favourites"}), 400
-
-    return jsonify({"msg": "No se pudo eliminar nada"}), 404
-
-# DELETE FAVORITE PLANET FROM USER ❌🎇🪐
-@app.route('/users/<int:user_id>/favourites/planet/<int:planet_id>', methods=['DELETE'])
-def delete_user_favourite_planet(user_id, planet_id):
-    # user exist ?
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({"msg": "User not found"}), 404
+            if (fav_type, target_id) not in current:
+                result["status"] = "not_in_favourites"
+            else:
+                favourite_id = current.pop((fav_type, target_id))
+                if favourite_id is None:
+                    # añadido antes en este mismo batch: basta con no insertarlo
+                    to_insert.pop((fav_type, target_id))
+                else:
+                    to_delete[(fav_type, target_id)] = (favourite_id, result)
+                result["status"] = "removed"
+
+    # los contadores salen de las filas que de verdad se escribieron (RETURNING o rowcount), no de lo planeado
+    inserted = insert_favourites([row for row, result in to_insert.values()]) if to_insert else []
+    deleted = delete_favourites([favourite_id for favourite_id, result in to_delete.values()]) if to_delete else []
+    for key in set(to_insert) - set(inserted):
+        to_insert[key][1]["status"] = "already_exists"
+    for key in set(to_delete) - set(deleted):
+        to_delete[key][1]["status"] = "not_in_favourites"
+
+    # tipo -> {id: +1/-1} para favourite_count, un UPDATE por tipo para todo el batch
+    count_changes = {fav_type: {} for fav_type in FAVOURITE_TARGETS}
+    for fav_type, target_id in inserted:
+        count_changes[fav_type][target_id] = count_changes[fav_type].get(target_id, 0) + 1
+    for fav_type, target_id in deleted:
+        count_changes[fav_type][target_id] = count_changes[fav_type].get(target_id, 0) - 1
+    for fav_type, deltas in count_changes.items():
+        change_favourite_counts(fav_type, deltas)
+    db.session.commit()
 
-    # planet exist ?
-    planet = Planet.query.get(planet_id)
-    if planet:
-        # planet exist in user-favourite?
-        existing_favourite = Favourite.query.filter_by(id_user=user_id, id_planets=planet_id).first() # id_planet de la entidad, planet_id de los que nos llega
-        if existing_favourite:
-            db.session.delete(existing_favourite)
-            db.session.commit()
-            return jsonify({"msg": f"Planet {planet_id} removed from user's favorites {user_id}"}), 200
-        else:
-            return jsonify({"msg": "Planet no exist in user's favourites"}), 400
+    # insert/delete en bloque no pasan por el flush del ORM, invalidamos los ETags a mano
+    if inserted or deleted:
+        cache.invalidate(favourites_version_key(user_id))
+    for fav_type, deltas in count_changes.items():
+        refresh_counts(fav_type, [target_id for target_id, delta in deltas.items() if delta])
 
-    return jsonify({"msg": "No se pudo eliminar nada"}), 404
+    return jsonify({"msg": f"Batch de favoritos del usuario {user_id}",
+                    "added": len(inserted),
+                    "removed": len(deleted),
+                    "results": results}), 200
 
 # /signup	<Signup>	Renderizar formulario de registro ✅
 # /login	<Login>	Renderizar formulario de Inicio de sesión ✅
 # /private	<Private>	Validar que solo ingresen usuarios autenticados y renderizar este componente EN FAV ✅
 
 # SIGNUP NEW USER ✔ TODO >> verificar si ya existe mail
-@app.route('/signup', methods=['POST'])
+@route('/signup', methods=['POST'])
+@limiter.limit("signup_ip", by_ip)
 def signup():
     request_body = request.get_json(force=True)
-     
+    if not isinstance(request_body.get("password"), str):
+        raise APIException("password must be a string", status_code=400)
+
     new_user = User(username=request_body["username"],
                     email = request_body["email"], 
-                    password = request_body["password"],
+                    password = hash_password(request_body["password"]),
                     is_active = request_body["is_active"]
                     )
 
@@ -307,7 +382,10 @@ def signup():
             }
 
 # LOGIN  ✔
-@app.route('/login', methods=['POST'])
+@route('/login', methods=['POST'])
+# por IP y por email: ni un cliente ni un ataque a una sola cuenta llegan al hash del password
+@limiter.limit("login_ip", by_ip)
+@limiter.limit("login_identity", by_login_email)
 def login():
 
     email = request.json.get("email", None)
@@ -317,8 +395,13 @@ def login():
     if not login_user:
         return jsonify({"msg": "User not found"}), 404
     
-    if email != login_user.email or password != login_user.password:
+    if email != login_user.email or not verify_password(login_user.password, password):
         return jsonify({"msg": "Incorrect login"})
+
+    # password en texto plano (filas antiguas) o con otro work factor: lo guardamos hasheado de nuevo
+    if needs_rehash(login_user.password):
+        login_user.password = hash_password(password)
+        db.session.commit()
     
     # pasamos el id para poder usarlo en >>>  get_jwt_identity()
     access_token = create_access_token(identity=login_user.id) 
@@ -332,13 +415,15 @@ def login():
 # TEST 
 # Protect a route with jwt_required, which will kick out requests
 # without a valid JWT present.
-@app.route("/protected", methods=["GET"])
+@route("/protected", methods=["GET"], auth=True)
 @jwt_required()
 def protected():
-    # Access the identity of the current user with get_jwt_identity
-    current_user = get_jwt_identity()
-    return jsonify(logged_in_as=current_user), 200
+    # Access the identity of the current user with get_jwt_identity (el sub del token es un string)
+    current_user_id = int(get_jwt_identity())
+    return jsonify(logged_in_as=current_user_id), 200
+
 
+app = create_app()
 
 # this only runs if `$ python src/app.py` is executed
 if __name__ == '__main__':
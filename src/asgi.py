@@ -0,0 +1,199 @@
+"""
+Alternative ASGI entry point: uvicorn asgi:application --app-dir src
+(wsgi.py with sync gunicorn workers is still the default, see Procfile).
+
+The hot read routes (catalog lists/details and /users/<id>/favourites) are answered by async
+handlers over an async SQLAlchemy engine (asyncpg for Postgres, aiosqlite for SQLite), so a
+slow query does not hold a worker. Every other route falls through to the Flask app, run in
+a thread by asgiref. The async handlers keep the same URLs, arguments and JSON bodies, but
+skip the Flask-only layers (response cache, ETags, Server-Timing); responses are still
+compressed as in compression.py.
+
+The async handlers always read from the primary (DATABASE_URL): REPLICA_DATABASE_URL (see
+replica.py) only applies to the routes that fall through to Flask. Routing them too would need
+the lag check and the per-table write times, both blocking calls, inside the event loop.
+"""
+import re
+from urllib.parse import parse_qsl
+from asgiref.wsgi import WsgiToAsgi
+from flask_jwt_extended import decode_token
+from flask_jwt_extended.exceptions import JWTDecodeError
+from jwt import ExpiredSignatureError, InvalidTokenError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import joinedload
+from werkzeug.datastructures import MultiDict
+from app import app as flask_app
+from catalog import build_filters, build_order
+from models import User, Favourite, FAVOURITE_TARGETS
+from json_provider import dumps
+from compression import settings, choose_encoding, compress
+from utils import APIException, get_fields, get_page_args, keyset_condition, serialize_fields, encode_cursor, row_columns, row_serializer
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url(url):
+    scheme, _, rest = url.partition("://")
+    dialect = scheme.split("+")[0]
+    if dialect not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver configured for {dialect}")
+    return f"{ASYNC_DRIVERS[dialect]}://{rest}"
+
+
+# mismos DB_POOL_* que la app sync; la clase del pool y connect_args dependen del driver async
+engine_options = {key: value for key, value in flask_app.config["SQLALCHEMY_ENGINE_OPTIONS"].items()
+                  if key not in ("poolclass", "connect_args")}
+engine = create_async_engine(async_database_url(flask_app.config["SQLALCHEMY_DATABASE_URI"]), **engine_options)
+Session = async_sessionmaker(engine, expire_on_commit=False)
+wsgi_fallback = WsgiToAsgi(flask_app)
+
+
+async def send_json(send, body, status=200, accept_encoding=None):
+    payload = dumps(body).encode() if status != 204 else b""
+    headers = [(b"content-type", b"application/json")]
+    if settings.enabled and status == 200:
+        headers.append((b"vary", b"Accept-Encoding"))
+        encoding = choose_encoding(accept_encoding)
+        if encoding is not None and len(payload) >= settings.min_size:
+            payload = compress(payload, encoding)
+            headers.append((b"content-encoding", encoding.encode()))
+    headers.append((b"content-length", str(len(payload)).encode()))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": payload})
+
+
+async def list_view(model, msg, args, headers):
+    fields = get_fields(model, args)
+    sort = build_order(model, args.get("sort"))
+    order = sort or [(model.id, False)]
+    cursor, limit = get_page_args(args)
+    if sort and not args.get("after"):
+        cursor = None
+
+    fields = fields or list(model.PUBLIC_FIELDS)
+    serialize = row_serializer(fields)
+    statement = select(*row_columns(model, fields, order)).where(*build_filters(model, args))
+    if cursor is not None:
+        statement = statement.where(keyset_condition(order, cursor))
+    statement = statement.order_by(*[column.desc() if descending else column.asc() for column, descending in order])
+
+    async with Session() as session:
+        result = await session.execute(statement.limit(limit + 1))
+        rows = result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = [getattr(rows[-1], column.key) for column, descending in order]
+    response_body = {"msg": msg,
+                     "results": [serialize(row) for row in rows]}
+    if sort:
+        response_body["next_after"] = encode_cursor(next_cursor) if next_cursor else None
+    else:
+        response_body["next_after_id"] = next_cursor[0] if next_cursor else None
+    return response_body, 200
+
+
+async def detail_view(model, label, object_id, args, headers):
+    fields = get_fields(model, args)
+    async with Session() as session:
+        if fields:
+            row = (await session.execute(select(*[getattr(model, field) for field in fields])
+                                         .where(model.id == object_id))).first()
+        else:
+            row = await session.get(model, object_id)
+    if row is None:
+        return {"msg": f"{label} not found"}, 404
+    return {"msg": "This is the one you are looking for",
+            "results": serialize_fields(row, fields) if fields else row.serialize()}, 200
+
+
+async def favourites_view(user_id, args, headers):
+    authorization = headers.get(b"authorization", b"").decode()
+    if not authorization.startswith("Bearer "):
+        return {"msg": "Missing Authorization Header"}, 401
+    try:
+        # decode_token lee la configuracion JWT del app de Flask; no toca la base de datos
+        with flask_app.app_context():
+            token = decode_token(authorization[len("Bearer "):])
+    except ExpiredSignatureError:
+        # mismos status y mensajes que los callbacks por defecto de Flask-JWT-Extended
+        return {"msg": "Token has expired"}, 401
+    except (InvalidTokenError, JWTDecodeError) as error:
+        return {"msg": str(error)}, 422
+    if token["type"] != "access":
+        return {"msg": "Only non-refresh tokens are allowed"}, 422
+    current_user_id = token[flask_app.config["JWT_IDENTITY_CLAIM"]]
+
+    if current_user_id != str(user_id):
+        return {"msg": "You don't have user favorites permission"}, 403
+
+    async with Session() as session:
+        user = await session.get(User, user_id)
+        if user is None or not user.is_active:
+            return {"msg": "User not found or inactive"}, 401
+        result = await session.execute(select(Favourite).options(
+            joinedload(Favourite.people),
+            joinedload(Favourite.planet),
+            joinedload(Favourite.vehicle),
+        ).where(Favourite.id_user == user_id))
+        favourites_list = result.scalars().all()
+
+    if not favourites_list:
+        return {"msg": "User not found"}, 204
+    return {"msg": f"Favourites de usario: {user_id}",
+            "results": [fav.serialize_with_target() for fav in favourites_list]}, 200
+
+
+def _build_routes():
+    routes = []
+    labels = {"people": "People", "planet": "Planet", "vehicle": "Vehicle"}
+    lists = {"people": ("/people", "These are the People from Star Wars"),
+             "planet": ("/planets", "These are the Planets from Star Wars"),
+             "vehicle": ("/vehicles", "These are the Vehicles from Star Wars")}
+    for fav_type, (url, msg) in lists.items():
+        model = FAVOURITE_TARGETS[fav_type][0]
+        routes.append((re.compile(rf"^{url}/?$"),
+                       lambda args, headers, model=model, msg=msg: list_view(model, msg, args, headers)))
+        routes.append((re.compile(rf"^{url}/(\d+)/?$"),
+                       lambda object_id, args, headers, model=model, label=labels[fav_type]:
+                       detail_view(model, label, int(object_id), args, headers)))
+    routes.append((re.compile(r"^/users/(\d+)/favourites/?$"),
+                   lambda user_id, args, headers: favourites_view(int(user_id), args, headers)))
+    return routes
+
+
+ROUTES = _build_routes()
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    if scope["type"] == "http" and scope["method"] == "GET":
+        args = MultiDict(parse_qsl(scope["query_string"].decode(), keep_blank_values=True))
+        # ?stream=true sigue en Flask, que ya sabe exportar por chunks
+        if not args.get("stream"):
+            for pattern, handler in ROUTES:
+                match = pattern.match(scope["path"])
+                if match:
+                    headers = dict(scope["headers"])
+                    try:
+                        body, status = await handler(*match.groups(), args, headers)
+                    except APIException as error:
+                        body, status = error.to_dict(), error.status_code
+                    await send_json(send, body, status, headers.get(b"accept-encoding", b"").decode())
+                    return
+
+    await wsgi_fallback(scope, receive, send)
@@ -0,0 +1,75 @@
+"""
+JWT identity handling: the token subject is the user id (as a string, as PyJWT requires), and
+`current_user` on protected routes is a snapshot of that user loaded once per identity and kept
+in a small in-process TTL cache, so @jwt_required() routes skip the User query on the hot path.
+
+Writes to a user (including is_active = False) evict its entry when the session commits. Other
+gunicorn workers keep their copy until JWT_USER_CACHE_TTL runs out (default 60 seconds).
+"""
+import os
+from collections import namedtuple
+from flask import jsonify
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from cache import LRUCache
+from models import db, User
+
+# lo que guardamos en cache: nunca el objeto del ORM, que pertenece a la session de otro request
+AuthenticatedUser = namedtuple("AuthenticatedUser", ["id", "username", "email", "is_active"])
+
+identity_cache = LRUCache(max_entries=int(os.getenv("JWT_USER_CACHE_SIZE", 10000)))
+
+
+def _cache_ttl():
+    return int(os.getenv("JWT_USER_CACHE_TTL", 60))
+
+
+def load_identity(user_id):
+    """AuthenticatedUser for an active user, None for unknown or deactivated users."""
+    authenticated = identity_cache.get(f"user:{user_id}")
+    if authenticated is not None:
+        return authenticated
+    user = db.session.get(User, user_id)
+    if user is None or not user.is_active:
+        return None
+    authenticated = AuthenticatedUser(user.id, user.username, user.email, user.is_active)
+    identity_cache.set(f"user:{user_id}", authenticated, _cache_ttl())
+    return authenticated
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_written_users(session, flush_context):
+    written = session.info.setdefault("written_users", set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            written.add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_written_users(session):
+    for user_id in session.info.pop("written_users", ()):
+        identity_cache.delete(f"user:{user_id}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_written_users(session):
+    session.info.pop("written_users", None)
+
+
+def setup_auth(jwt):
+
+    @jwt.user_identity_loader
+    def user_identity(identity):
+        return str(identity.id if isinstance(identity, (User, AuthenticatedUser)) else identity)
+
+    @jwt.user_lookup_loader
+    def user_lookup(jwt_header, jwt_data):
+        try:
+            user_id = int(jwt_data["sub"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        return load_identity(user_id)
+
+    @jwt.user_lookup_error_loader
+    def user_lookup_error(jwt_header, jwt_data):
+        return jsonify({"msg": "User not found or inactive"}), 401
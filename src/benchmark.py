@@ -0,0 +1,130 @@
+"""
+Route benchmark harness used by `flask bench-routes`.
+
+Seeds a throwaway database (a temporary SQLite file, or any DATABASE_URL the models support)
+with `size` rows per catalog table, starts the app as in production (loadtest.start_server)
+and drives every route of app.py through loadtest.py: sitemap, route catalog, health checks,
+lists, details, users, favourites, login, signup, add/delete favourite and the batch route.
+The report is plain JSON so two runs can be compared with compare_reports().
+"""
+from itertools import islice
+from sqlalchemy import create_engine, insert
+from flask_jwt_extended import create_access_token
+from models import db, User, People, Planet, Vehicle, Favourite, reconcile_favourite_counts
+from importer import import_columns, write_chunk
+from security import hash_password
+
+BENCH_PASSWORD = "benchmark-password"
+SEED_CHUNK_SIZE = 5000
+CLIMATES = ("arid", "temperate", "frozen", "murky")
+
+
+def catalog_rows(model, size):
+    """`size` valid rows for a catalog table (People has a unique constraint on every column)."""
+    for i in range(1, size + 1):
+        if model is People:
+            yield {"name": f"Person {i}", "height": i, "mass": f"{i}kg", "hair_color": f"hair {i}",
+                   "skin_color": f"skin {i}", "eye_color": f"eye {i}", "birth_year": f"{i}BBY", "gender": f"gender {i}"}
+        elif model is Planet:
+            yield {"name": f"Planet {i}", "rotation_period": 23, "orbital_period": 304, "diameter": 10000 + i % 5000,
+                   "climate": CLIMATES[i % 4], "gravity": 1.0, "terrain": "desert", "surface_water": 1, "population": i * 10}
+        else:
+            yield {"name": f"Vehicle {i}", "model": f"Model {i % 100}", "manufacturer": f"Manufacturer {i % 50}",
+                   "cost_in_credits": i * 100, "length": 10.5, "speed": i % 1000, "crew": i % 10, "cargo_capacity": i,
+                   "consumables": "1 month", "vehicle_class": ("wheeled", "repulsorcraft")[i % 2]}
+
+
+def seed_database(database_url, size, users=100, favourites=30):
+    """Drops and recreates every table, then loads `size` rows per catalog table.
+
+    User i is user{i}@bench.local with BENCH_PASSWORD; user 1 starts with `favourites` favourites
+    spread over people, planets and vehicles.
+    """
+    engine = create_engine(database_url)
+    db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for model in (People, Planet, Vehicle):
+            columns = import_columns(model)
+            rows = catalog_rows(model, size)
+            while chunk := list(islice(rows, SEED_CHUNK_SIZE)):
+                write_chunk(conn, model, columns, chunk)
+
+        # el mismo hash para todos: hashear cada password tardaria minutos
+        password = hash_password(BENCH_PASSWORD)
+        conn.execute(insert(User), [{"username": f"user{i}", "email": f"user{i}@bench.local",
+                                     "password": password, "is_active": True} for i in range(1, users + 1)])
+
+        per_type = min(favourites // 3 + 1, size)
+        rows = []
+        for column in ("id_peoples", "id_planets", "id_vehicles"):
+            for target_id in range(1, per_type + 1):
+                row = {"name": "Nombre del favorito", "id_user": 1, "id_peoples": None, "id_planets": None, "id_vehicles": None}
+                row[column] = target_id
+                rows.append(row)
+        if favourites:
+            conn.execute(insert(Favourite), rows[:favourites])
+            reconcile_favourite_counts(conn)
+    engine.dispose()
+
+
+def route_plan(size, users, total, slow_total):
+    """[(name, [(method, path, body), ...], requests, headers)] for every route, reads first.
+
+    Writes use users that start without favourites (2 and 3) and a different target on each
+    request, so every add/delete does real work instead of answering "already exists".
+    """
+    auth = {"Authorization": f"Bearer {create_access_token(identity=1)}"}
+    batch_auth = {"Authorization": f"Bearer {create_access_token(identity=3)}"}
+    middle = max(size // 2, 1)
+    writes = min(total, size)
+    plan = [
+        ("sitemap", [("GET", "/", None)], total, {}),
+        ("routes", [("GET", "/routes", None)], total, {}),
+        ("healthz", [("GET", "/healthz", None)], total, {}),
+        ("readyz", [("GET", "/readyz", None)], total, {}),
+        ("list_people", [("GET", "/people", None)], total, {}),
+        ("list_people_page", [("GET", f"/people?after_id={middle}&limit=20", None)], total, {}),
+        ("list_planets_filtered", [("GET", "/planets?climate=arid&sort=-population&limit=20", None)], total, {}),
+        ("list_vehicles", [("GET", "/vehicles", None)], total, {}),
+        ("list_users", [("GET", "/users", None)], total, {}),
+        ("detail_people", [("GET", f"/people/{middle}", None)], total, {}),
+        ("detail_planet", [("GET", f"/planets/{middle}", None)], total, {}),
+        ("detail_vehicle", [("GET", f"/vehicles/{middle}", None)], total, {}),
+        ("detail_user", [("GET", f"/users/{min(users, middle)}", None)], total, {}),
+        ("user_favourites", [("GET", "/users/1/favourites", None)], total, auth),
+        ("protected", [("GET", "/protected", None)], total, auth),
+        ("favourite_count", [("GET", "/people/1/favourite-count", None)], total, {}),
+        ("leaderboard", [("GET", "/planets/leaderboard", None)], total, {}),
+        ("add_favourite", [("POST", f"/users/2/favourites/people/{i}", None) for i in range(1, writes + 1)], writes, {}),
+        ("delete_favourite", [("DELETE", f"/users/2/favourites/people/{i}", None) for i in range(1, writes + 1)], writes, {}),
+        ("batch_favourites", [("POST", "/users/3/favourites/batch",
+                               {"operations": [{"action": "add", "type": "planet", "id": (i * 5 + offset) % size + 1}
+                                               for offset in range(5)]}) for i in range(writes)], writes, batch_auth),
+        ("login", [("POST", "/login", {"email": f"user{i % users + 1}@bench.local", "password": BENCH_PASSWORD})
+                   for i in range(slow_total)], slow_total, {}),
+        ("signup", [("POST", "/signup", {"username": f"signup{i}", "email": f"signup{i}@bench.local",
+                                         "password": BENCH_PASSWORD, "is_active": True})
+                    for i in range(slow_total)], slow_total, {}),
+    ]
+    return plan
+
+
+def compare_reports(baseline, current, tolerance=0.2):
+    """Routes that got slower than `tolerance` (p95 up or throughput down) or run more queries."""
+    regressions = []
+    previous = {result["rows"]: result["routes"] for result in baseline.get("results", [])}
+    for result in current["results"]:
+        for route, stats in result["routes"].items():
+            before = previous.get(result["rows"], {}).get(route)
+            if not before:
+                continue
+            checks = [
+                ("p95_ms", before["p95_ms"], stats["p95_ms"], lambda old, new: new > old * (1 + tolerance)),
+                ("requests_per_sec", before["requests_per_sec"], stats["requests_per_sec"], lambda old, new: new < old * (1 - tolerance)),
+                ("queries_per_request", before.get("queries_per_request"), stats.get("queries_per_request"), lambda old, new: new > old),
+            ]
+            for metric, old, new, worse in checks:
+                if old is not None and new is not None and worse(old, new):
+                    regressions.append({"rows": result["rows"], "route": route, "metric": metric, "baseline": old, "current": new})
+    return regressions
@@ -0,0 +1,290 @@
+"""
+Read-through cache for the catalog GET routes (people, planets, vehicles) and ETags
+for every read route.
+
+Keys carry a per-table version number: writing to a table bumps its version, so every
+cached response for that table stops matching at once without having to scan the keys.
+The in-process LRU backend is the default; RedisCache shares entries (and versions) between
+workers. With the LRU backend a write only invalidates the worker that made it, the other
+workers serve their copy until CACHE_TTL expires.
+
+The same versions give cheap strong ETags: no need to build or hash the body to answer
+If-None-Match, so a 304 costs no SQL at all.
+"""
+import math
+import os
+import pickle
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from functools import wraps
+from flask import g, request, make_response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class CacheBackend:
+    """Interface for cache stores. Values are opaque Python objects."""
+
+    # True si todos los workers ven los mismos contadores (ej. Redis)
+    shared = False
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def incr(self, key):
+        """Atomically increments an integer counter that never expires nor gets evicted."""
+        raise NotImplementedError
+
+    def counter(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class LRUCache(CacheBackend):
+    """In-process LRU with a TTL per entry. Safe to share between threads of a worker."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def counter(self, key):
+        return self._counters.get(key, 0)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisCache(CacheBackend):
+    """Shared backend over any redis-py compatible client (redis.Redis, fakeredis...)."""
+
+    shared = True
+
+    def __init__(self, client, prefix="swapi:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl or None)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+    def counter(self, key):
+        return int(self.client.get(self.prefix + key) or 0)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+
+def matching_etag(etag):
+    """The tag in If-None-Match that names `etag` or one of its compressed variants, else None."""
+    if etag in request.if_none_match:
+        return etag
+    # las respuestas comprimidas llevan "<etag>-gzip" / "<etag>-br" (ver compression.py)
+    return next((tag for tag in request.if_none_match.as_set() if tag.startswith(f"{etag}-")), None)
+
+
+# distingue los contadores de este proceso de los de otros workers o de un reinicio
+_BOOT_ID = uuid.uuid4().hex[:8]
+
+
+class Cache:
+    def __init__(self):
+        self.backend = LRUCache()
+        self.ttl = 300
+        self.enabled = True
+        # segundos que se recuerda cada escritura, para la replica (lo fija replica.init_app; 0 = no)
+        self.write_window = 0
+
+    def init_app(self, app):
+        self.ttl = int(os.getenv("CACHE_TTL", self.ttl))
+        self.enabled = os.getenv("CACHE_ENABLED", "1") != "0"
+        redis_url = os.getenv("CACHE_REDIS_URL")
+        if redis_url:
+            import redis  # optional, solo si se configura un cache compartido
+            self.backend = RedisCache(redis.Redis.from_url(redis_url))
+        else:
+            self.backend = LRUCache(int(os.getenv("CACHE_MAX_ENTRIES", 1024)))
+        app.extensions["response_cache"] = self
+
+    def version(self, table):
+        return self.backend.counter(f"version:{table}")
+
+    def invalidate(self, *tables):
+        now = time.time()
+        for table in tables:
+            # la marca antes que la version: quien ve la version nueva ya ve la escritura reciente
+            if self.write_window:
+                self.backend.set(f"written_at:{table}", now, math.ceil(self.write_window))
+            self.backend.incr(f"version:{table}")
+
+    def written_within(self, tables, seconds):
+        """True if one of `tables` was written (invalidated) less than `seconds` ago."""
+        now = time.time()
+        for table in tables:
+            written_at = self.backend.get(f"written_at:{table}")
+            if written_at is not None and now - written_at < seconds:
+                return True
+        return False
+
+    def key_for(self, tables):
+        versions = ",".join(f"{table}={self.version(table)}" for table in tables)
+        return f"response:{versions}:{request.full_path}"
+
+    def etag(self, tables):
+        versions = "-".join(f"{table}.{self.version(table)}" for table in tables)
+        if self.backend.shared:
+            epoch = "shared"
+        else:
+            # un worker no ve las escrituras de los otros: el ETag caduca con el TTL, igual que el cache
+            epoch = f"{_BOOT_ID}.{int(time.time() // max(self.ttl, 1))}"
+        return f"{epoch}-{versions}-{zlib.crc32(request.full_path.encode()):x}"
+
+    def check_etag(self, tables):
+        """Returns (etag, response): response is a ready 304 when the client already has this version."""
+        etag = self.etag(tables)
+        matched = matching_etag(etag)
+        if matched is not None:
+            response = make_response("", 304)
+            response.set_etag(matched)
+            return etag, response
+        return etag, None
+
+    def conditional(self, *tables):
+        """Answers If-None-Match with 304 before the view runs; tags 200 responses with an ETag."""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                etag, not_modified = self.check_etag(tables)
+                if not_modified is not None:
+                    return not_modified
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200:
+                    response.set_etag(etag)
+                return response
+            return wrapper
+        return decorator
+
+    def cached(self, *tables):
+        """Caches 200 responses of a GET view until the TTL runs out or one of `tables` is written."""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return view(*args, **kwargs)
+                key = self.key_for(tables)
+                entry = self.backend.get(key)
+                if entry is not None:
+                    g.response_cache_key = key
+                    body, status, mimetype = entry
+                    response = make_response(body, status)
+                    response.mimetype = mimetype
+                    response.headers["X-Cache"] = "HIT"
+                    return response
+
+                response = make_response(view(*args, **kwargs))
+                # leido de la replica mientras se escribian estas tablas: puede estar atrasado, no se guarda
+                stale = g.get("read_from_replica") and self.written_within(tables, self.write_window)
+                if response.status_code == 200 and not response.is_streamed and not stale:
+                    self.backend.set(key, (response.get_data(), response.status_code, response.mimetype), self.ttl)
+                    # compression.py guarda las versiones comprimidas bajo esta misma clave
+                    g.response_cache_key = key
+                response.headers["X-Cache"] = "MISS"
+                return response
+            return wrapper
+        return decorator
+
+
+cache = Cache()
+
+# tablas con contador de version; cualquier escritura (API, Flask-Admin, CLI) las invalida.
+# los favoritos se versionan por usuario: "favourite:<id_user>"
+VERSIONED_TABLES = ("people", "planet", "vehicle", "user")
+
+
+def favourites_version_key(user_id):
+    return f"favourite:{user_id}"
+
+
+def favourite_count_version_key(table):
+    # favourite_count no sale en las respuestas cacheadas: su propia clave, sin invalidar la tabla
+    return f"favourite_count:{table}"
+
+
+def mark_written(session, *keys):
+    """Adds version keys for the session's commit to invalidate, for Core writes the flush doesn't see."""
+    session.info.setdefault("written_tables", set()).update(keys)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_written_tables(session, flush_context):
+    written = session.info.setdefault("written_tables", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table in VERSIONED_TABLES:
+            written.add(table)
+        elif table == "favourite":
+            written.add(favourites_version_key(obj.id_user))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_written_tables(session):
+    written = session.info.pop("written_tables", None)
+    if written:
+        cache.invalidate(*written)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_written_tables(session):
+    session.info.pop("written_tables", None)
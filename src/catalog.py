@@ -0,0 +1,228 @@
+"""
+Generic catalog resources (people, planets, vehicles): list, detail and user favourite routes
+for any model, with the same read path for all of them (keyset pagination, ?fields=, filters,
+response cache and ETags).
+
+Filtering and sorting on the lists:
+
+    ?climate=arid                      equality
+    ?population__gte=1000&diameter__lt=5000   ranges, numeric columns only
+    ?name__prefix=Lu                   prefix search
+    ?sort=-population,name             multi-key sort, "-" for descending
+
+Only the columns in model.FILTER_FIELDS can be filtered or sorted on, and all of them are
+indexed, so every combination can be answered from an index instead of a full scan.
+"""
+import sys
+from flask import jsonify, request
+from sqlalchemy import and_, delete, select
+from cache import cache, favourites_version_key, favourite_count_version_key
+from models import db, User, Favourite, FAVOURITE_TARGETS, add_favourite, change_favourite_counts
+from utils import APIException, INT64_MIN, INT64_MAX, list_response, get_one
+from leaderboard import leaderboards, refresh_counts
+from ratelimit import limiter, by_ip, by_user_id
+from replica import replica
+
+RANGE_OPERATORS = {
+    "gt": lambda column, value: column > value,
+    "gte": lambda column, value: column >= value,
+    "lt": lambda column, value: column < value,
+    "lte": lambda column, value: column <= value,
+}
+
+# parametros de la query que no son filtros
+RESERVED_ARGS = ("after", "after_id", "limit", "stream", "fields", "sort")
+
+
+def _is_numeric(column):
+    return column.type.python_type in (int, float)
+
+
+def _convert(column, field, value):
+    try:
+        value = column.type.python_type(value)
+    except ValueError:
+        kind = "an integer" if column.type.python_type is int else "a number"
+        raise APIException(f"{field} must be {kind}", status_code=400)
+    # el driver no puede pasar un entero de mas de 64 bits (OverflowError, un 500)
+    if isinstance(value, int) and not INT64_MIN <= value <= INT64_MAX:
+        raise APIException(f"{field} is out of range", status_code=400)
+    return value
+
+
+def prefix_condition(column, prefix):
+    """name >= prefix AND name < next_prefix uses a plain btree index on any database;
+    the LIKE keeps the match exact whatever the collation."""
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    conditions = [column >= prefix, column.like(escaped + "%", escape="\\")]
+    following = ord(prefix[-1]) + 1
+    if 0xD800 <= following <= 0xDFFF:
+        # los surrogates no se pueden codificar: el siguiente caracter valido es U+E000
+        following = 0xE000
+    if following <= sys.maxunicode:
+        conditions.append(column < prefix[:-1] + chr(following))
+    # con el ultimo code point no hay cota superior: queda el >= y el LIKE
+    return and_(*conditions)
+
+
+def build_filters(model, args):
+    """WHERE clauses from the request args (a dict or MultiDict)."""
+    conditions = []
+    for key in args:
+        if key in RESERVED_ARGS:
+            continue
+        field, _, operator = key.partition("__")
+        if field not in model.PUBLIC_FIELDS:
+            # parametros ajenos (ej. cache busters ?_=123) se ignoran
+            continue
+        if field not in model.FILTER_FIELDS:
+            raise APIException(f"Cannot filter on {field}", status_code=400,
+                               payload={"allowed": list(model.FILTER_FIELDS)})
+        column = getattr(model, field)
+        for raw in (args.getlist(key) if hasattr(args, "getlist") else [args[key]]):
+            if operator == "":
+                conditions.append(column == _convert(column, field, raw))
+            elif operator in RANGE_OPERATORS and _is_numeric(column):
+                conditions.append(RANGE_OPERATORS[operator](column, _convert(column, field, raw)))
+            elif operator == "prefix" and not _is_numeric(column) and raw:
+                conditions.append(prefix_condition(column, raw))
+            else:
+                raise APIException(f"Unsupported filter {key}", status_code=400)
+    return conditions
+
+
+def build_order(model, sort):
+    """[(column, descending), ...] from "-population,name", always ending on id so the order is total."""
+    if not sort:
+        return None
+    order = []
+    for item in sort.split(","):
+        item = item.strip()
+        descending = item.startswith("-")
+        field = item.lstrip("-")
+        if field != "id" and field not in model.FILTER_FIELDS:
+            raise APIException(f"Cannot sort on {field}", status_code=400,
+                               payload={"allowed": ["id"] + list(model.FILTER_FIELDS)})
+        order.append((getattr(model, field), descending))
+    if not any(column.key == "id" for column, descending in order):
+        # desempate por id en la misma direccion: el indice (columna, id) se recorre sin ordenar en memoria
+        order.append((model.id, order[-1][1]))
+    return order
+
+
+def list_catalog(model, msg, args):
+    return list_response(model, msg,
+                         conditions=build_filters(model, args),
+                         order=build_order(model, args.get("sort")))
+
+
+def register_catalog(app, fav_type, url, plural, label, list_msg):
+    """Adds GET <url>, GET <url>/<id> and POST/DELETE /users/<user_id>/favourites/<fav_type>/<id>,
+    plus GET <url>/<id>/favourite-count and GET <url>/leaderboard.
+
+    Endpoint names follow the existing handlers: get_<plural>, get_one_<fav_type>,
+    add_user_favourite_<fav_type> and delete_user_favourite_<fav_type>.
+    """
+    model, column = FAVOURITE_TARGETS[fav_type]
+    table = model.__tablename__
+
+    @cache.conditional(table)
+    @cache.cached(table)
+    @replica.read_only(table)
+    def list_view():
+        # paginado por id: ?after_id=<ultimo id recibido>&limit=<n>, o ?stream=true para exportar todo
+        return list_catalog(model, list_msg, request.args)
+
+    @cache.conditional(table)
+    @cache.cached(table)
+    @replica.read_only(table)
+    def detail_view(object_id):
+        item, serialize = get_one(model, object_id)
+
+        if not item:
+            return jsonify({"msg": f"{label} not found"}), 404
+
+        response_body = { "msg": "This is the one you are looking for",
+                         "results": serialize(item)}
+
+        return jsonify(response_body), 200
+
+    @limiter.limit("favourites_ip", by_ip)
+    @limiter.limit("favourites_identity", by_user_id)
+    def add_favourite_view(user_id, object_id):
+        # user exist ?
+        if not db.session.get(User, user_id):
+            return jsonify({"msg": "User not found"}), 404
+
+        # target exist ?
+        if not db.session.get(model, object_id):
+            return jsonify({"msg": "No se pudo agregar nada"}), 404
+
+        # insert-on-conflict: el indice unico (user, target) rechaza el duplicado en el mismo INSERT
+        if not add_favourite(user_id, fav_type, object_id):
+            return jsonify({"msg": f"{label} already in user's favourites"}), 400
+
+        change_favourite_counts(fav_type, {object_id: 1})
+        db.session.commit()
+        # el INSERT no pasa por el flush del ORM, invalidamos el ETag de favoritos a mano
+        cache.invalidate(favourites_version_key(user_id))
+        refresh_counts(fav_type, [object_id])
+
+        return jsonify({"msg": f"{label} {object_id} se agrego a favoritos del usuario {user_id} "}), 201
+
+    @limiter.limit("favourites_ip", by_ip)
+    @limiter.limit("favourites_identity", by_user_id)
+    def delete_favourite_view(user_id, object_id):
+        # user exist ?
+        if not db.session.get(User, user_id):
+            return jsonify({"msg": "User not found"}), 404
+
+        # target exist ?
+        if not db.session.get(model, object_id):
+            return jsonify({"msg": "No se pudo eliminar nada"}), 404
+
+        # DELETE directo: si no borra ninguna fila es que no estaba en favoritos
+        result = db.session.execute(delete(Favourite).where(Favourite.id_user == user_id,
+                                                            getattr(Favourite, column) == object_id))
+        if result.rowcount == 0:
+            db.session.rollback()
+            return jsonify({"msg": f"{label} no exist in user's favourites"}), 400
+
+        change_favourite_counts(fav_type, {object_id: -result.rowcount})
+        db.session.commit()
+        cache.invalidate(favourites_version_key(user_id))
+        refresh_counts(fav_type, [object_id])
+
+        return jsonify({"msg": f"{label} {object_id} removed from user's favorites {user_id}"}), 200
+
+    @replica.read_only(table, favourite_count_version_key(table))
+    def favourite_count_view(object_id):
+        # contador desnormalizado: una lectura por primary key, sin COUNT(*) sobre favourite
+        row = db.session.execute(select(model.id, model.name, model.favourite_count)
+                                 .where(model.id == object_id)).first()
+        if row is None:
+            return jsonify({"msg": f"{label} not found"}), 404
+
+        return jsonify({"msg": f"Users with {label} {object_id} in their favourites",
+                        "results": {"id": row.id, "name": row.name, "favourite_count": row.favourite_count}}), 200
+
+    @replica.read_only(table, favourite_count_version_key(table))
+    def leaderboard_view():
+        board = leaderboards[fav_type]
+        limit = request.args.get("limit", 10, type=int)
+        if limit < 1 or limit > board.size:
+            raise APIException(f"limit must be between 1 and {board.size}", status_code=400)
+
+        results = [{"id": target_id, "name": name, "favourite_count": count}
+                   for count, target_id, name in board.top(limit)]
+        return jsonify({"msg": f"Most favourited {plural}", "results": results}), 200
+
+    app.add_url_rule(url, f"get_{plural}", list_view, methods=['GET'])
+    app.add_url_rule(f"{url}/leaderboard", f"get_{plural}_leaderboard", leaderboard_view, methods=['GET'])
+    app.add_url_rule(f"{url}/<int:object_id>/favourite-count", f"get_{fav_type}_favourite_count",
+                     favourite_count_view, methods=['GET'])
+    app.add_url_rule(f"{url}/<int:object_id>", f"get_one_{fav_type}", detail_view, methods=['GET'])
+    app.add_url_rule(f"/users/<int:user_id>/favourites/{fav_type}/<int:object_id>",
+                     f"add_user_favourite_{fav_type}", add_favourite_view, methods=['POST'])
+    app.add_url_rule(f"/users/<int:user_id>/favourites/{fav_type}/<int:object_id>",
+                     f"delete_user_favourite_{fav_type}", delete_favourite_view, methods=['DELETE'])
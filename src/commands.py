@@ -0,0 +1,346 @@
+"""
+Flask CLI commands. Run them with `pipenv run flask <command>` (FLASK_APP=src/app.py).
+"""
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+import click
+from sqlalchemy import create_engine, insert, select, text
+from werkzeug.security import generate_password_hash, check_password_hash
+from flask_jwt_extended import create_access_token
+from sqlalchemy.orm import Session
+from models import db, Planet, People, FAVOURITE_TARGETS, reconcile_favourite_counts
+from json_provider import orjson
+from utils import row_columns, row_serializer
+from logger import queue_logging
+from catalog import build_filters, build_order
+from loadtest import SRC_DIR, run_load, run_requests, start_server, free_port
+from benchmark import seed_database, route_plan, compare_reports
+from importer import FORMATS, detect_format, import_rows
+from cache import cache
+
+
+def setup_commands(app):
+
+    @app.cli.command("import-catalog")
+    @click.argument("table", type=click.Choice(list(FAVOURITE_TARGETS)))
+    @click.argument("source", type=click.File("r", encoding="utf-8-sig"))
+    @click.option("--format", "fmt", type=click.Choice(FORMATS), help="Defaults to csv for *.csv files, jsonl otherwise.")
+    @click.option("--chunk-size", default=5000, help="Rows per batch and transaction.")
+    @click.option("--upsert", is_flag=True, help="Update rows whose name already exists instead of adding new ones.")
+    @click.option("--max-errors", default=100, help="Invalid rows tolerated before the import stops.")
+    def import_catalog(table, source, fmt, chunk_size, upsert, max_errors):
+        """Bulk loads people, planet or vehicle rows from a JSON Lines or CSV file ('-' for stdin)."""
+        model = FAVOURITE_TARGETS[table][0]
+        fmt = fmt or detect_format(source.name)
+
+        def progress(report):
+            click.echo(f"{report['rows_read']} rows, {report['rows_per_sec']} rows/sec", err=True)
+
+        report = import_rows(db.engine, model, source, fmt, chunk_size, upsert, max_errors, progress)
+        # inserts de Core: los eventos de la session no se enteran, se invalida a mano
+        cache.invalidate(model.__tablename__)
+        click.echo(json.dumps(report, indent=2))
+        if report["aborted"]:
+            raise click.ClickException(f"More than {max_errors} invalid rows, import stopped")
+
+    @app.cli.command("reconcile-favourite-counts")
+    def reconcile_favourite_counts_command():
+        """Rebuilds people/planet/vehicle favourite_count from the favourite table (fixes drift after admin edits or imports)."""
+        fixed = reconcile_favourite_counts(db.session.connection())
+        db.session.commit()
+        # los workers recargan su leaderboard al vencer LEADERBOARD_TTL
+        click.echo(json.dumps({"rows_fixed": fixed}, indent=2))
+
+    @app.cli.command("bench-login")
+    @click.option("--iterations", default="100000,300000,600000", help="Comma separated pbkdf2 work factors to compare.")
+    @click.option("--rounds", default=20, help="Password checks per work factor.")
+    @click.option("--threads", default=os.cpu_count() or 1, help="Threads for the parallel run (defaults to the number of cores).")
+    def bench_login(iterations, rounds, threads):
+        """Login throughput per core at each work factor, to size gunicorn workers and PASSWORD_HASH_THREADS."""
+        report = {"cores": os.cpu_count(), "threads": threads, "rounds": rounds, "results": []}
+        for work_factor in [int(item) for item in iterations.split(",")]:
+            stored = generate_password_hash("benchmark-password", f"pbkdf2:sha256:{work_factor}")
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                check_password_hash(stored, "benchmark-password")
+            single = time.perf_counter() - start
+
+            # mismo numero de checks por thread, en paralelo
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                list(pool.map(lambda _: check_password_hash(stored, "benchmark-password"), range(rounds * threads)))
+            parallel = time.perf_counter() - start
+
+            report["results"].append({
+                "iterations": work_factor,
+                "ms_per_login": round(single / rounds * 1000, 2),
+                "logins_per_sec_per_core": round(rounds / single, 2),
+                "logins_per_sec_all_threads": round(rounds * threads / parallel, 2),
+            })
+        click.echo(json.dumps(report, indent=2))
+
+    @app.cli.command("bench-catalog")
+    @click.option("--sizes", default="1000,10000,100000", help="Comma separated planet table sizes.")
+    @click.option("--repeat", default=50, help="Runs of each query per size.")
+    def bench_catalog(sizes, repeat):
+        """Filtered/sorted /planets queries on indexed vs unindexed throwaway SQLite tables."""
+        report = {"repeat": repeat, "results": []}
+        for size in [int(item) for item in sizes.split(",")]:
+            queries = {
+                "climate_equal": {"climate": "arid"},
+                "sorted_by_population": {"sort": "-population"},
+                # ventana de 1000 filas cerca del final de la tabla
+                "population_range": {"population__gte": str(size * 9), "population__lt": str(size * 9 + 10000)},
+                "name_prefix_sorted": {"name__prefix": "Tatooine-9", "sort": "name"},
+            }
+            result = {"rows": size}
+            for indexed in (True, False):
+                with tempfile.TemporaryDirectory() as tmp:
+                    engine = create_engine(f"sqlite:///{tmp}/bench.db")
+                    Planet.__table__.create(engine)
+                    if not indexed:
+                        for index in Planet.__table__.indexes:
+                            index.drop(engine)
+                    with engine.begin() as conn:
+                        conn.execute(insert(Planet), [{
+                            "name": f"Tatooine-{i}", "rotation_period": 23, "orbital_period": 304,
+                            "diameter": 10000 + i % 5000, "climate": ("arid", "temperate", "frozen", "murky")[i % 4],
+                            "gravity": 1.0, "terrain": "desert", "surface_water": 1, "population": i * 10,
+                        } for i in range(size)])
+                    with engine.connect() as conn:
+                        for name, args in queries.items():
+                            order = build_order(Planet, args.get("sort")) or [(Planet.id, False)]
+                            statement = select(Planet.id, Planet.name, Planet.population) \
+                                .where(*build_filters(Planet, args)) \
+                                .order_by(*[column.desc() if descending else column for column, descending in order]) \
+                                .limit(20)
+                            # pagina del medio de la tabla, como haria un cliente recorriendo con ?after_id=
+                            if name == "climate_equal":
+                                statement = statement.where(Planet.id > size // 2)
+                            conn.execute(statement).all()
+                            start = time.perf_counter()
+                            for _ in range(repeat):
+                                conn.execute(statement).all()
+                            elapsed = (time.perf_counter() - start) / repeat * 1000
+                            key = "indexed_ms" if indexed else "full_scan_ms"
+                            result.setdefault(name, {})[key] = round(elapsed, 3)
+                            if indexed:
+                                plan = conn.execute(text("EXPLAIN QUERY PLAN " + str(statement.compile(engine, compile_kwargs={"literal_binds": True})))).all()
+                                result[name]["plan"] = " / ".join(row[-1] for row in plan)
+                    engine.dispose()
+            report["results"].append(result)
+        click.echo(json.dumps(report, indent=2))
+
+    @app.cli.command("loadtest")
+    @click.argument("url")
+    @click.option("--requests", "total", default=1000, help="Total requests.")
+    @click.option("--concurrency", default=50, help="Requests in flight at the same time.")
+    @click.option("--header", multiple=True, help="Extra header, e.g. 'Authorization: Bearer ...'.")
+    def loadtest(url, total, concurrency, header):
+        """Requests/sec and p50/p95/p99 latency for one URL of a running server."""
+        headers = dict(item.split(": ", 1) for item in header)
+        click.echo(json.dumps(run_load(url, total, concurrency, headers), indent=2))
+
+    @app.cli.command("compare-serving")
+    @click.option("--workers", default=os.cpu_count() or 1, help="Worker processes for each server.")
+    @click.option("--requests", "total", default=2000, help="Requests per route and server.")
+    @click.option("--concurrency", default=200, help="Requests in flight at the same time.")
+    @click.option("--user-id", default=1, help="User whose /users/<id>/favourites is loaded.")
+    def compare_serving(workers, total, concurrency, user_id):
+        """Sync gunicorn (wsgi.py) vs uvicorn (asgi.py) on /people and /users/<id>/favourites, same database."""
+        token = create_access_token(identity=user_id)
+        routes = {
+            "/people": {},
+            f"/users/{user_id}/favourites": {"Authorization": f"Bearer {token}"},
+        }
+        # sin cache de respuestas para medir el camino hasta la base de datos
+        env = {"CACHE_ENABLED": "0"}
+        report = {"workers": workers, "results": {}}
+        for kind in ("wsgi", "asgi"):
+            port = free_port()
+            server = start_server(kind, port, workers, env)
+            try:
+                for path, headers in routes.items():
+                    run_load(f"http://127.0.0.1:{port}{path}", min(total, 100), concurrency, headers)  # warm up
+                    report["results"].setdefault(path, {})[kind] = run_load(f"http://127.0.0.1:{port}{path}", total, concurrency, headers)
+            finally:
+                server.terminate()
+                server.wait()
+        click.echo(json.dumps(report, indent=2))
+
+    @app.cli.command("bench-routes")
+    @click.option("--sizes", default="1000,100000", help="Comma separated rows per catalog table; the database is reseeded for each.")
+    @click.option("--database-url", help="Throwaway database to seed (its tables are DROPPED). Defaults to a temporary SQLite file.")
+    @click.option("--server", type=click.Choice(["wsgi", "asgi"]), default="wsgi", help="gunicorn (wsgi.py) or uvicorn (asgi.py).")
+    @click.option("--workers", default=os.cpu_count() or 1, help="Server worker processes.")
+    @click.option("--requests", "total", default=500, help="Requests per route.")
+    @click.option("--slow-requests", default=20, help="Requests for login and signup (each one hashes a password).")
+    @click.option("--concurrency", default=20, help="Requests in flight at the same time.")
+    @click.option("--users", default=100, help="Seeded users.")
+    @click.option("--cache/--no-cache", default=False, help="Response cache on the server (off measures the database path).")
+    @click.option("--output", type=click.Path(dir_okay=False, writable=True), help="Also write the JSON report to this file.")
+    @click.option("--baseline", type=click.File("r"), help="Earlier report: lists the routes that regressed and exits with 1.")
+    @click.option("--tolerance", default=0.2, help="Allowed p95/throughput change against --baseline (0.2 = 20%).")
+    def bench_routes(sizes, database_url, server, workers, total, slow_requests, concurrency, users, cache,
+                     output, baseline, tolerance):
+        """Throughput, p50/p95/p99 and queries per request for every route, on a freshly seeded database."""
+        if database_url:
+            click.confirm(f"All tables in {database_url} will be dropped, continue?", abort=True)
+        report = {"server": server, "workers": workers, "concurrency": concurrency, "cache": cache, "results": []}
+        for size in [int(item) for item in sizes.split(",")]:
+            with tempfile.TemporaryDirectory() as tmp:
+                url = database_url or f"sqlite:///{tmp}/bench.db"
+                click.echo(f"seeding {size} rows per table", err=True)
+                seed_database(url, size, users)
+                # sin rate limiting: todas las requests vienen de la misma IP
+                env = {"DATABASE_URL": url, "CACHE_ENABLED": "1" if cache else "0", "LOG_LEVEL": "WARNING",
+                       "RATE_LIMIT_ENABLED": "0"}
+                port = free_port()
+                process = start_server(server, port, workers, env)
+                result = {"rows": size, "routes": {}}
+                try:
+                    base_url = f"http://127.0.0.1:{port}"
+                    # el puerto abre antes de que los workers terminen de importar la app
+                    run_requests(base_url, [("GET", "/healthz", None)], 50, concurrency)
+                    for name, requests, count, headers in route_plan(size, users, total, slow_requests):
+                        click.echo(f"{size} rows: {name}", err=True)
+                        result["routes"][name] = run_requests(base_url, requests, count, concurrency, headers)
+                finally:
+                    process.terminate()
+                    process.wait()
+                report["results"].append(result)
+
+        if baseline:
+            report["regressions"] = compare_reports(json.load(baseline), report, tolerance)
+        click.echo(json.dumps(report, indent=2))
+        if output:
+            with open(output, "w") as out:
+                json.dump(report, out, indent=2)
+        if report.get("regressions"):
+            raise SystemExit(1)
+
+    @app.cli.command("bench-startup")
+    @click.option("--runs", default=5, help="Fresh interpreters per admin mode (medians are reported).")
+    @click.option("--modes", default="eager,lazy,off", help="Comma separated ADMIN_MODE values to compare.")
+    def bench_startup(runs, modes):
+        """Cold import of app.py and first-request latency per ADMIN_MODE, each run in a new interpreter."""
+        # lo que hace un worker al arrancar: importar app y atender los primeros requests
+        probe = (
+            "import json, time\n"
+            "start = time.perf_counter()\n"
+            "from app import app\n"
+            "imported = time.perf_counter()\n"
+            "client = app.test_client()\n"
+            "client.get('/people')\n"
+            "first = time.perf_counter()\n"
+            "client.get('/admin/')\n"
+            "admin = time.perf_counter()\n"
+            "print(json.dumps({'import_ms': (imported - start) * 1000, 'first_request_ms': (first - imported) * 1000,"
+            " 'first_admin_request_ms': (admin - first) * 1000}))\n"
+        )
+        report = {"runs": runs, "results": {}}
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite:///{tmp}/bench.db"
+            seed_database(url, 100, users=1)
+            # FLASK_RUN_FROM_CLI haria cargar Alembic y los comandos, que un worker no carga
+            env = {key: value for key, value in os.environ.items() if key != "FLASK_RUN_FROM_CLI"}
+            env.update({"DATABASE_URL": url, "LOG_LEVEL": "WARNING"})
+            for mode in modes.split(","):
+                samples = []
+                for _ in range(runs):
+                    output = subprocess.run([sys.executable, "-c", probe], cwd=SRC_DIR, env={**env, "ADMIN_MODE": mode},
+                                            capture_output=True, text=True, check=True).stdout
+                    samples.append(json.loads(output.strip().splitlines()[-1]))
+                report["results"][mode] = {key: round(statistics.median(sample[key] for sample in samples), 2)
+                                           for key in samples[0]}
+        click.echo(json.dumps(report, indent=2))
+
+    @app.cli.command("bench-json")
+    @click.option("--rows", default=10000, help="Rows of People and Planet to serialize.")
+    @click.option("--repeat", default=5, help="Runs of each path (the best one is reported).")
+    def bench_json(rows, repeat):
+        """Old (ORM objects + serialize() + stdlib json) vs new (plain rows + orjson) list serialization."""
+        report = {"rows": rows, "orjson": orjson is not None, "results": {}}
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{tmp}/bench.db")
+            People.__table__.create(engine)
+            Planet.__table__.create(engine)
+            with engine.begin() as conn:
+                conn.execute(insert(People), [{
+                    "name": f"Person {i}", "height": i, "mass": f"{i}kg", "hair_color": f"hair {i}",
+                    "skin_color": f"skin {i}", "eye_color": f"eye {i}", "birth_year": f"{i}BBY", "gender": f"gender {i}",
+                } for i in range(rows)])
+                conn.execute(insert(Planet), [{
+                    "name": f"Planet {i}", "rotation_period": 23, "orbital_period": 304, "diameter": i,
+                    "climate": "arid", "gravity": 1.0, "terrain": "desert", "surface_water": 1, "population": i,
+                } for i in range(rows)])
+
+            for model in (People, Planet):
+                fields = list(model.PUBLIC_FIELDS)
+                serialize = row_serializer(fields)
+                timings = {"old": [], "new": []}
+                for _ in range(repeat):
+                    with Session(engine) as session:
+                        start = time.perf_counter()
+                        results = [item.serialize() for item in session.query(model).order_by(model.id)]
+                        built = time.perf_counter()
+                        json.dumps({"results": results}, sort_keys=True)
+                        timings["old"].append((built - start, time.perf_counter() - built))
+
+                    with Session(engine) as session:
+                        start = time.perf_counter()
+                        result = session.execute(select(*row_columns(model, fields, [(model.id, False)])).order_by(model.id))
+                        results = [serialize(row) for row in result]
+                        built = time.perf_counter()
+                        app.json.dumps({"results": results})
+                        timings["new"].append((built - start, time.perf_counter() - built))
+
+                report["results"][model.__name__] = {
+                    path: {
+                        "fetch_and_build_ms": round(min(build for build, encode in runs) * 1000, 2),
+                        "encode_ms": round(min(encode for build, encode in runs) * 1000, 2),
+                        "total_ms": round(min(build + encode for build, encode in runs) * 1000, 2),
+                    } for path, runs in timings.items()
+                }
+            engine.dispose()
+        click.echo(json.dumps(report, indent=2))
+
+    @app.cli.command("bench-logging")
+    @click.option("--rows", default=100, help="Rows in the payload the old code printed.")
+    @click.option("--calls", default=2000, help="Log calls per mode.")
+    def bench_logging(rows, calls):
+        """Request-thread cost of print()-ing the payload vs the queued structured logger."""
+        payload = [{"id": i, "name": f"Person {i}", "height": i, "mass": f"{i}kg", "gender": "n/a"} for i in range(rows)]
+        report = {"rows": rows, "calls": calls, "us_per_call": {}}
+        with tempfile.TemporaryDirectory() as tmp:
+            # como stdout de gunicorn: un archivo con line buffering
+            with open(os.path.join(tmp, "print.log"), "w", buffering=1) as out:
+                start = time.perf_counter()
+                for _ in range(calls):
+                    print("result people: ", payload, file=out)
+                report["us_per_call"]["print_full_payload"] = round((time.perf_counter() - start) / calls * 1e6, 2)
+
+            with open(os.path.join(tmp, "structured.log"), "w", buffering=1) as out:
+                bench_log = logging.getLogger("api.bench")
+                bench_log.propagate = False
+                for mode, level, rate in (("debug_disabled", logging.INFO, 1.0),
+                                          ("info_queued", logging.INFO, 1.0),
+                                          ("info_sampled_1pct", logging.INFO, 0.01)):
+                    handler, listener = queue_logging(out, rate)
+                    bench_log.handlers = [handler]
+                    bench_log.setLevel(level)
+                    emit = bench_log.debug if mode == "debug_disabled" else bench_log.info
+                    start = time.perf_counter()
+                    for _ in range(calls):
+                        emit("request", extra={"path": "/people", "status": 200, "count": rows})
+                    report["us_per_call"][mode] = round((time.perf_counter() - start) / calls * 1e6, 2)
+                    listener.stop()
+        click.echo(json.dumps(report, indent=2))
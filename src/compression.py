@@ -0,0 +1,100 @@
+"""
+Response compression negotiated through Accept-Encoding: brotli when the `brotli` package is
+installed and the client accepts it, gzip otherwise.
+
+    COMPRESS_ENABLED         1/0 (default 1)
+    COMPRESS_MIN_SIZE        bodies smaller than this many bytes go out as they are (default 1024)
+    COMPRESS_LEVEL           gzip level, 1..9 (default 6)
+    COMPRESS_BROTLI_QUALITY  brotli quality, 0..11 (default 5)
+
+Responses served by cache.cached keep their compressed variants in the same cache, next to
+the plain body and under the same table versions: a hot list is compressed once per encoding,
+not on every hit. Compressed responses get their own ETag ("<etag>-gzip", "<etag>-br"), as
+required for a different representation, and Vary: Accept-Encoding.
+"""
+import gzip
+import os
+from flask import g, request
+from werkzeug.http import parse_accept_header
+from cache import cache
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional, sin el solo se ofrece gzip
+    brotli = None
+
+# en orden de preferencia del servidor cuando el cliente acepta varias con la misma calidad
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/html", "text/plain", "text/css", "application/javascript"}
+
+
+class CompressionSettings:
+    def __init__(self):
+        self.enabled = os.getenv("COMPRESS_ENABLED", "1") != "0"
+        self.min_size = int(os.getenv("COMPRESS_MIN_SIZE", 1024))
+        self.level = int(os.getenv("COMPRESS_LEVEL", 6))
+        self.brotli_quality = int(os.getenv("COMPRESS_BROTLI_QUALITY", 5))
+
+
+settings = CompressionSettings()
+
+
+def choose_encoding(accept_encoding):
+    """Best encoding we can produce for an Accept-Encoding header value, None for identity."""
+    if not accept_encoding:
+        return None
+    accepted = parse_accept_header(accept_encoding)
+    best, best_quality = None, 0
+    for encoding in ENCODINGS:
+        quality = accepted[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=settings.brotli_quality)
+    # mtime=0: mismo input, mismos bytes (el cache y los ETags no cambian entre workers)
+    return gzip.compress(data, compresslevel=settings.level, mtime=0)
+
+
+def _compressed_body(data, encoding):
+    key = g.get("response_cache_key")
+    if key is None or not cache.enabled:
+        return compress(data, encoding)
+    compressed_key = f"{key}|{encoding}"
+    body = cache.backend.get(compressed_key)
+    if body is None:
+        body = compress(data, encoding)
+        cache.backend.set(compressed_key, body, cache.ttl)
+    return body
+
+
+def setup_compression(app):
+
+    @app.after_request
+    def compress_response(response):
+        if not settings.enabled or request.method == "HEAD":
+            return response
+        if response.status_code == 304:
+            response.vary.add("Accept-Encoding")
+            return response
+        if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+                or "Content-Encoding" in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        data = response.get_data()
+        encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+        if encoding is None or len(data) < settings.min_size:
+            return response
+
+        response.set_data(_compressed_body(data, encoding))
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{encoding}", weak)
+        return response
@@ -0,0 +1,76 @@
+"""
+Pieces of the app factory that don't need the API views: configure() (settings and database),
+the Flask-Admin app and LazyWSGIApp. admin_wsgi.py builds the admin from here without
+importing app.py, whose module-level create_app() would build the whole API too.
+
+Mounted under the API (ADMIN_MODE=lazy) the admin app runs on the API's engines, so a worker
+keeps one connection pool and /admin/pool/ shows the pool the API is using.
+"""
+import os
+import threading
+from flask import Flask
+from json_provider import FastJSONProvider
+from models import db
+from pool import engine_options_from_env
+from replica import replica
+
+
+def configure(app, api_app=None):
+    """Settings and database shared by the API and the admin app; with `api_app`, its engines are reused."""
+    app.url_map.strict_slashes = False
+    # jsonify con orjson si esta instalado (ver json_provider.py)
+    app.json = FastJSONProvider(app)
+
+    # Setup the Flask-JWT-Extended extension
+    app.config["JWT_SECRET_KEY"] = "super-secret"  # Change this!
+
+    db_url = os.getenv("DATABASE_URL")
+    if db_url is not None:
+        app.config['SQLALCHEMY_DATABASE_URI'] = db_url.replace("postgres://", "postgresql://")
+    else:
+        app.config['SQLALCHEMY_DATABASE_URI'] = "sqlite:////tmp/test.db"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # pool de conexiones configurable por variables de entorno (ver pool.py)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options_from_env(app.config['SQLALCHEMY_DATABASE_URI'])
+    # bind "replica" con REPLICA_DATABASE_URL, antes de db.init_app (ver replica.py)
+    replica.init_app(app)
+    if api_app is None:
+        db.init_app(app)
+    else:
+        share_engines(app, api_app)
+
+
+def share_engines(app, api_app):
+    """Registers `app` with db on the engines already created for `api_app`, instead of a second set of pools."""
+    # lo mismo que db.init_app salvo crear los engines: Flask-SQLAlchemy los guarda por app.
+    # son internos de Flask-SQLAlchemy 3.1, por eso el Pipfile lo fija en <3.2
+    app.extensions["sqlalchemy"] = db
+    app.teardown_appcontext(db._teardown_session)
+    db._app_engines[app] = db._app_engines[api_app]
+
+
+def create_admin_app(url="/admin", api_app=None):
+    """Flask-Admin on its own app: mounted under /admin by ADMIN_MODE=lazy (on `api_app`'s engines), or alone in admin_wsgi.py."""
+    from admin import setup_admin  # Flask-Admin y sus vistas solo cuando se usan
+
+    # sin carpeta static propia: /static/admin es de Flask-Admin
+    app = Flask(__name__, static_folder=None)
+    configure(app, api_app)
+    setup_admin(app, url)
+    return app
+
+
+class LazyWSGIApp:
+    """WSGI app built by `factory` on its first request."""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._app = None
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        if self._app is None:
+            with self._lock:
+                if self._app is None:
+                    self._app = self.factory()
+        return self._app(environ, start_response)
@@ -0,0 +1,173 @@
+"""
+Bulk loading of the catalog tables (people, planet, vehicle) from JSON Lines or CSV files,
+used by `flask import-catalog`.
+
+Rows are read and validated one at a time (the file is never loaded whole) and written in
+chunks, one transaction per chunk: COPY on Postgres with psycopg2, one executemany INSERT
+elsewhere. With upsert, each chunk looks up its names in one SELECT (name is indexed on the
+three tables), updates the rows it finds with one executemany UPDATE and inserts the rest.
+
+The `id` column is always left to the database. These are Core statements, so the session
+events in cache.py don't see them: the caller invalidates the cache.
+"""
+import csv
+import io
+import json
+import time
+from sqlalchemy import Float, Integer, String, bindparam, insert, select, update
+
+FORMATS = ("jsonl", "csv")
+
+
+def detect_format(filename):
+    return "csv" if filename.lower().endswith(".csv") else "jsonl"
+
+
+def read_rows(stream, fmt):
+    """Yields (line number, row) from a JSON Lines or CSV stream, one row at a time."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except json.JSONDecodeError:
+            yield number, line
+
+
+def import_columns(model):
+    # sin id ni contadores con server_default (favourite_count lo mantiene la app)
+    return [column for column in model.__table__.columns if not column.primary_key and column.server_default is None]
+
+
+def _coerce(column, value):
+    if isinstance(column.type, Integer):
+        if isinstance(value, float):
+            if not value.is_integer():
+                raise ValueError
+            return int(value)
+        if isinstance(value, bool):
+            raise ValueError
+        return int(value)
+    if isinstance(column.type, Float):
+        if isinstance(value, bool):
+            raise ValueError
+        return float(value)
+    return str(value)
+
+
+def validate_row(columns, row):
+    """Column values ready to insert, or ValueError with a message for the report."""
+    if not isinstance(row, dict):
+        raise ValueError("not a JSON object")
+    values = {}
+    for column in columns:
+        value = row.get(column.name)
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == "":
+            if not column.nullable:
+                raise ValueError(f"{column.name} is required")
+            values[column.name] = None
+            continue
+        try:
+            value = _coerce(column, value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{column.name}: invalid value {value!r}") from None
+        if isinstance(column.type, String) and column.type.length and len(value) > column.type.length:
+            raise ValueError(f"{column.name} is longer than {column.type.length} characters")
+        values[column.name] = value
+    return values
+
+
+def _copy_rows(conn, model, columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for values in rows:
+        writer.writerow([values[column.name] for column in columns])
+    buffer.seek(0)
+    names = ", ".join(column.name for column in columns)
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {model.__tablename__} ({names}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+
+def _insert_rows(conn, model, columns, rows):
+    if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2":
+        _copy_rows(conn, model, columns, rows)
+    else:
+        conn.execute(insert(model), rows)
+
+
+def write_chunk(conn, model, columns, rows, upsert=False):
+    """Writes one chunk of validated rows. Returns (inserted, updated)."""
+    if not upsert:
+        _insert_rows(conn, model, columns, rows)
+        return len(rows), 0
+
+    # la ultima fila con el mismo nombre gana
+    by_name = {values["name"]: values for values in rows}
+    existing = set(conn.execute(select(model.name).where(model.name.in_(list(by_name)))).scalars())
+    if existing:
+        # los bindparam no pueden llamarse como las columnas del SET
+        statement = update(model).where(model.name == bindparam("b_name")).values(
+            {column.name: bindparam(f"b_{column.name}") for column in columns if column.name != "name"})
+        conn.execute(statement, [{f"b_{key}": value for key, value in by_name[name].items()} for name in existing])
+    new_rows = [values for name, values in by_name.items() if name not in existing]
+    if new_rows:
+        _insert_rows(conn, model, columns, new_rows)
+    return len(new_rows), len(existing)
+
+
+def import_rows(engine, model, stream, fmt, chunk_size=5000, upsert=False, max_errors=100, progress=None):
+    """Streams `stream` into the model's table. Returns a report with counts and rows/sec.
+
+    Invalid rows are skipped and counted; after `max_errors` of them the import stops (chunks
+    already written stay committed). `progress(report)` is called after every chunk.
+    """
+    columns = import_columns(model)
+    report = {"table": model.__tablename__, "format": fmt, "chunk_size": chunk_size, "upsert": upsert,
+              "rows_read": 0, "inserted": 0, "updated": 0, "invalid": 0, "aborted": False, "errors": []}
+    start = time.perf_counter()
+
+    def flush(chunk):
+        with engine.begin() as conn:
+            inserted, updated = write_chunk(conn, model, columns, chunk, upsert)
+        report["inserted"] += inserted
+        report["updated"] += updated
+        _timing(report, start)
+        if progress is not None:
+            progress(report)
+
+    chunk = []
+    for line, row in read_rows(stream, fmt):
+        report["rows_read"] += 1
+        try:
+            chunk.append(validate_row(columns, row))
+        except ValueError as error:
+            report["invalid"] += 1
+            if len(report["errors"]) < 20:
+                report["errors"].append(f"line {line}: {error}")
+            if report["invalid"] > max_errors:
+                report["aborted"] = True
+                break
+            continue
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    if chunk and not report["aborted"]:
+        flush(chunk)
+    _timing(report, start)
+    return report
+
+
+def _timing(report, start):
+    elapsed = time.perf_counter() - start
+    report["seconds"] = round(elapsed, 3)
+    report["rows_per_sec"] = round(report["rows_read"] / elapsed, 1) if elapsed else None
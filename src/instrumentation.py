@@ -0,0 +1,119 @@
+"""
+Per-request instrumentation: SQL query count, DB time, serialization time and total time.
+Each response gets a Server-Timing header and the per-endpoint totals are served at /metrics
+in Prometheus text format (the numbers are per worker process).
+"""
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, request, has_request_context, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# endpoint -> totals, compartido por los threads del worker
+_totals = {}
+_totals_lock = threading.Lock()
+
+METRICS = [
+    ("requests", "api_requests_total", "Requests served"),
+    ("queries", "api_db_queries_total", "SQL statements executed"),
+    ("db", "api_db_seconds_total", "Time spent waiting on the database"),
+    ("serialize", "api_serialize_seconds_total", "Time spent serializing rows"),
+    ("total", "api_request_seconds_total", "Total time spent in the view"),
+]
+
+
+def _stats():
+    if not has_request_context():
+        return None
+    if "request_stats" not in g:
+        g.request_stats = {"queries": 0, "db": 0.0, "serialize": 0.0, "start": time.perf_counter()}
+    return g.request_stats
+
+
+# Engine (la clase) para cubrir cualquier engine que cree db, sin necesitar app context aqui
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _stats()
+    if stats is not None:
+        stats["queries"] += 1
+        stats["db"] += elapsed
+
+
+# un statement que falla no llega a after_cursor_execute: sin esto query_start crece en cada conexion del pool
+@event.listens_for(Engine, "handle_error")
+def _discard_failed_query(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+@contextmanager
+def timed(name):
+    """Adds the elapsed time of the block to the current request's `name` bucket (e.g. "serialize")."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = _stats()
+        if stats is not None:
+            stats[name] = stats.get(name, 0.0) + time.perf_counter() - start
+
+
+def current_query_count():
+    stats = _stats()
+    return stats["queries"] if stats is not None else 0
+
+
+def _record(endpoint, stats, total):
+    with _totals_lock:
+        entry = _totals.setdefault(endpoint, dict.fromkeys(("requests", "queries", "db", "serialize", "total"), 0))
+        entry["requests"] += 1
+        entry["queries"] += stats["queries"]
+        entry["db"] += stats["db"]
+        entry["serialize"] += stats["serialize"]
+        entry["total"] += total
+
+
+def render_metrics():
+    with _totals_lock:
+        snapshot = {endpoint: dict(entry) for endpoint, entry in _totals.items()}
+    lines = []
+    for key, name, help_text in METRICS:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for endpoint in sorted(snapshot):
+            lines.append(f'{name}{{endpoint="{endpoint}"}} {snapshot[endpoint][key]}')
+    return "\n".join(lines) + "\n"
+
+
+def setup_instrumentation(app):
+
+    @app.before_request
+    def start_request_timer():
+        _stats()
+
+    @app.after_request
+    def add_server_timing(response):
+        stats = _stats()
+        total = time.perf_counter() - stats["start"]
+        endpoint = request.endpoint or "unmatched"
+        if endpoint != "metrics":
+            _record(endpoint, stats, total)
+        # milisegundos, formato https://www.w3.org/TR/server-timing/
+        response.headers["Server-Timing"] = ", ".join([
+            f'db;dur={stats["db"] * 1000:.2f};desc="{stats["queries"]} queries"',
+            f'serialize;dur={stats["serialize"] * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ])
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
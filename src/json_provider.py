@@ -0,0 +1,56 @@
+"""
+JSON encoding for the API: orjson when it is installed, the standard library otherwise.
+Output is the same either way: sorted keys, and dates, decimals and UUIDs as Flask's default
+provider writes them (dates as HTTP dates, "Tue, 02 Jan 2024 03:04:05 GMT"). One difference
+is left: orjson writes NaN and Infinity as null.
+
+Encoding a response (jsonify) counts as "serialize" time in Server-Timing and /metrics.
+"""
+import json
+from flask.json.provider import DefaultJSONProvider
+from instrumentation import timed
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional
+    orjson = None
+
+if orjson is not None:
+    # fechas por `default`, como Flask (orjson las escribiria en ISO-8601)
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def dumps(obj):
+    """Compact JSON as str, for code that writes JSON outside of jsonify (streams, ASGI)."""
+    # keys ordenadas, igual que jsonify: un ?stream=true o una respuesta ASGI no cambian el orden
+    if orjson is not None:
+        return orjson.dumps(obj, default=DefaultJSONProvider.default, option=ORJSON_OPTIONS | orjson.OPT_SORT_KEYS).decode()
+    return json.dumps(obj, default=DefaultJSONProvider.default, separators=(",", ":"), sort_keys=True)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._orjson_dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # codificar es la mayor parte de serializar, se suma a lo que midieron las vistas
+        with timed("serialize"):
+            if orjson is None:
+                return super().response(*args, **kwargs)
+            obj = self._prepare_response_obj(args, kwargs)
+            # bytes directo al response, sin pasar por str
+            return self._app.response_class(self._orjson_dumps(obj) + b"\n", mimetype=self.mimetype)
+
+    def _orjson_dumps(self, obj):
+        option = ORJSON_OPTIONS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option)
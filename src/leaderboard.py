@@ -0,0 +1,103 @@
+"""
+"Most favourited" leaderboards for people, planets and vehicles, kept in memory.
+
+Each worker holds the top LEADERBOARD_SIZE entries (id, name, favourite_count) per type,
+loaded with one query on the (favourite_count, id) index and updated in place after every
+favourite write, so GET <url>/leaderboard never runs SQL on the hot path. When a write drops
+an entry to the bottom of the list, someone outside it may deserve its place, so the list is
+reloaded on the next read. Writes made by other workers show up after LEADERBOARD_TTL seconds
+(default 30).
+"""
+import os
+import threading
+import time
+from sqlalchemy import select
+from models import db, FAVOURITE_TARGETS
+
+
+class TopK:
+    """The k items with the highest favourite_count (ties by id), refreshed from each write."""
+
+    def __init__(self, model, size, ttl):
+        self.model = model
+        self.size = size
+        self.ttl = ttl
+        self._entries = None  # [(count, id, name)] ordenado, None = hay que cargar
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _sort_key(entry):
+        count, target_id, name = entry
+        return (-count, target_id)
+
+    def _load(self):
+        model = self.model
+        rows = db.session.execute(
+            select(model.favourite_count, model.id, model.name)
+            .where(model.favourite_count > 0)
+            .order_by(model.favourite_count.desc(), model.id)
+            .limit(self.size)).all()
+        return [tuple(row) for row in rows]
+
+    def top(self, limit):
+        with self._lock:
+            fresh = self._entries is not None and time.monotonic() - self._loaded_at < self.ttl
+            entries = self._entries if fresh else None
+        if entries is None:
+            entries = self._load()
+            with self._lock:
+                self._entries, self._loaded_at = entries, time.monotonic()
+        return entries[:limit]
+
+    def record(self, target_id, name, count):
+        """Applies the new count of one item after a committed write."""
+        with self._lock:
+            if self._entries is None:
+                return
+            entries = self._entries
+            full = len(entries) >= self.size
+            floor = entries[-1] if entries else None
+            current = next((entry for entry in entries if entry[1] == target_id), None)
+            if current is not None:
+                entries.remove(current)
+                if count <= 0:
+                    # con la lista llena, el siguiente de afuera no esta en memoria
+                    if full:
+                        self._entries = None
+                    return
+                entry = (count, target_id, name)
+                if full and count < current[0] and self._sort_key(entry) >= self._sort_key(floor):
+                    self._entries = None
+                    return
+                entries.append(entry)
+            elif count > 0:
+                entry = (count, target_id, name)
+                if full and self._sort_key(entry) >= self._sort_key(floor):
+                    return
+                entries.append(entry)
+            else:
+                return
+            entries.sort(key=self._sort_key)
+            del entries[self.size:]
+
+    def reset(self):
+        with self._lock:
+            self._entries = None
+
+
+_size = int(os.getenv("LEADERBOARD_SIZE", 100))
+_ttl = int(os.getenv("LEADERBOARD_TTL", 30))
+leaderboards = {fav_type: TopK(model, _size, _ttl) for fav_type, (model, column) in FAVOURITE_TARGETS.items()}
+
+
+def refresh_counts(fav_type, target_ids):
+    """Reads the committed counts of `target_ids` (one IN query) and updates the leaderboard."""
+    if not target_ids:
+        return
+    board = leaderboards[fav_type]
+    model = board.model
+    rows = db.session.execute(
+        select(model.id, model.name, model.favourite_count).where(model.id.in_(list(target_ids)))).all()
+    for target_id, name, count in rows:
+        board.record(target_id, name, count)
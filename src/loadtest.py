@@ -0,0 +1,128 @@
+"""
+Small HTTP load generator (asyncio, no extra dependencies) used by the `flask loadtest`,
+`flask compare-serving` and `flask bench-routes` commands. One connection per request, the
+same for every server.
+
+SQL queries per request are read from the Server-Timing header that instrumentation.py adds
+(responses without it, like the native ASGI handlers, are left out of that average).
+"""
+import asyncio
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+QUERIES_PATTERN = re.compile(rb'desc="(\d+) queries"')
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def _request(host, port, method, path, headers, body=None):
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {host}:{port}", "Connection: close"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    payload = json.dumps(body).encode() if body is not None else b""
+    if body is not None:
+        lines += ["Content-Type: application/json", f"Content-Length: {len(payload)}"]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + payload)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    status = int(response.split(b" ", 2)[1])
+    return status, time.perf_counter() - start, response
+
+
+async def _run(base_url, requests, total, concurrency, headers):
+    parts = urlsplit(base_url)
+    prefix = parts.path.rstrip("/")
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses = {}
+    queries = []
+    errors = 0
+
+    async def one(method, path, body):
+        nonlocal errors
+        async with semaphore:
+            try:
+                status, elapsed, response = await _request(parts.hostname, parts.port or 80, method, prefix + path, headers, body)
+            except (OSError, ValueError, IndexError):
+                errors += 1
+                return
+            latencies.append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+            match = QUERIES_PATTERN.search(response.split(b"\r\n\r\n", 1)[0])
+            if match:
+                queries.append(int(match.group(1)))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(*requests[index % len(requests)]) for index in range(total)])
+    wall = time.perf_counter() - start
+    latencies.sort()
+    ms = lambda value: round(value * 1000, 2) if value is not None else None
+    return {
+        "url": base_url + (requests[0][1] if len(requests) == 1 else ""),
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "requests_per_sec": round(len(latencies) / wall, 1) if wall else None,
+        "p50_ms": ms(percentile(latencies, 0.50)),
+        "p95_ms": ms(percentile(latencies, 0.95)),
+        "p99_ms": ms(percentile(latencies, 0.99)),
+        "queries_per_request": round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+def run_requests(base_url, requests, total=None, concurrency=50, headers=None):
+    """Sends `requests` ((method, path, json body or None) tuples, cycled until `total`) to `base_url`."""
+    return asyncio.run(_run(base_url, requests, total or len(requests), concurrency, headers or {}))
+
+
+def run_load(url, total=1000, concurrency=50, headers=None):
+    """Fires `total` GETs at `url`, `concurrency` at a time. Returns throughput and latency percentiles."""
+    parts = urlsplit(url)
+    path = parts.path + ("?" + parts.query if parts.query else "")
+    return run_requests(f"{parts.scheme}://{parts.netloc}", [("GET", path, None)], total, concurrency, headers)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+def start_server(kind, port, workers, env=None):
+    """Starts the app as in production: 'wsgi' (sync gunicorn, Procfile) or 'asgi' (uvicorn)."""
+    if kind == "wsgi":
+        command = [sys.executable, "-m", "gunicorn", "wsgi", "--chdir", SRC_DIR,
+                   "-b", f"127.0.0.1:{port}", "-w", str(workers), "--log-level", "warning"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "asgi:application", "--app-dir", SRC_DIR,
+                   "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    process = subprocess.Popen(command, env={**os.environ, **(env or {})}, cwd=SRC_DIR)
+    wait_for_port(port)
+    return process
@@ -0,0 +1,134 @@
+"""
+Structured logging: one JSON object per line, written by a background thread.
+
+Request threads only put the record on a queue (QueueHandler); a QueueListener thread formats
+and writes it, so slow stdout never adds latency to a request. Records below WARNING can be
+sampled per endpoint, and debug output costs nothing while LOG_LEVEL is above DEBUG.
+
+    LOG_LEVEL          DEBUG, INFO, WARNING... (default INFO)
+    LOG_SAMPLE_RATE    fraction of INFO/DEBUG records kept, 0..1 (default 1)
+    LOG_SAMPLE_RATES   per endpoint override, e.g. "get_people=0.01,login=1"
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from flask import g, request, has_request_context
+
+log = logging.getLogger("api")
+
+# campos estandar de LogRecord que no se copian como extra
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_FIELDS})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """Adds the endpoint to each record and drops sampled-out INFO/DEBUG records."""
+
+    def __init__(self, default_rate, rates):
+        super().__init__()
+        self.default_rate = default_rate
+        self.rates = rates
+
+    def filter(self, record):
+        endpoint = request.endpoint if has_request_context() else None
+        if endpoint and not hasattr(record, "endpoint"):
+            record.endpoint = endpoint
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(endpoint, self.default_rate)
+        return rate >= 1 or random.random() < rate
+
+
+def parse_rates(raw):
+    rates = {}
+    for item in filter(None, (part.strip() for part in (raw or "").split(","))):
+        endpoint, _, rate = item.partition("=")
+        rates[endpoint.strip()] = float(rate)
+    return rates
+
+
+def _queue_handler(records, default_rate, rates):
+    queue_handler = logging.handlers.QueueHandler(records)
+    queue_handler.addFilter(ContextFilter(default_rate, rates or {}))
+    return queue_handler
+
+
+def _json_handler(stream):
+    stream_handler = logging.StreamHandler(stream)
+    stream_handler.setFormatter(JSONFormatter())
+    return stream_handler
+
+
+def queue_logging(stream, default_rate=1.0, rates=None):
+    """Returns (queue_handler, started listener) writing JSON lines to `stream` from a background thread."""
+    records = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(records, _json_handler(stream), respect_handler_level=True)
+    listener.start()
+    return _queue_handler(records, default_rate, rates), listener
+
+
+# el listener de la API es uno por proceso: cada create_app() (los tests construyen decenas)
+# solo cambia los handlers, no arranca otro thread ni otro atexit
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def setup_logging(app):
+    global _listener
+    level = os.getenv("LOG_LEVEL", "INFO").upper()
+    with _listener_lock:
+        if _listener is None:
+            _listener = logging.handlers.QueueListener(queue.SimpleQueue(), _json_handler(sys.stdout),
+                                                       respect_handler_level=True)
+            _listener.start()
+            atexit.register(_listener.stop)
+        else:
+            _listener.handlers = (_json_handler(sys.stdout),)
+    listener = _listener
+    queue_handler = _queue_handler(listener.queue, float(os.getenv("LOG_SAMPLE_RATE", 1)),
+                                   parse_rates(os.getenv("LOG_SAMPLE_RATES")))
+
+    log.handlers = [queue_handler]
+    log.setLevel(level)
+    log.propagate = False
+    app.logger.handlers = [queue_handler]
+    app.logger.setLevel(level)
+    app.extensions["log_listener"] = listener
+
+    @app.before_request
+    def start_access_log():
+        g.log_start = time.perf_counter()
+
+    @app.after_request
+    def access_log(response):
+        if log.isEnabledFor(logging.INFO):
+            log.info("request", extra={
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "duration_ms": round((time.perf_counter() - g.get("log_start", time.perf_counter())) * 1000, 2),
+            })
+        return response
+
+    return listener
@@ -1,16 +1,25 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql
+from replica import RoutingSession
+from cache import favourite_count_version_key, mark_written
 
-db = SQLAlchemy()
+# los SELECT de las rutas de solo lectura pueden ir a la replica (ver replica.py)
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 # ROSINI:
 # favoritos n planetas 1
 # usuario 1 favoritos n
 
 class User(db.Model):
+    # columnas que se pueden pedir con ?fields= (las mismas que serialize)
+    PUBLIC_FIELDS = ("id", "email", "username")
+
     id = db.Column(db.Integer, primary_key=True)
     username =  db.Column(db.String(120), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password = db.Column(db.String(80), unique=False, nullable=False)
+    # hash pbkdf2 de werkzeug (ver security.py), nunca el password en texto plano
+    password = db.Column(db.String(255), unique=False, nullable=False)
     is_active = db.Column(db.Boolean(), unique=False, nullable=False)
 
     # Relationships 1 a n con Favourite
@@ -37,6 +46,13 @@ class Favourite(db.Model):
     id_peoples = db.Column(db.Integer, db.ForeignKey('people.id'),nullable=True)
     id_planets = db.Column(db.Integer, db.ForeignKey('planet.id'),nullable=True)
     id_vehicles = db.Column(db.Integer, db.ForeignKey('vehicle.id'),nullable=True)
+
+    # un usuario no puede tener el mismo favorito dos veces; ademas sirven de indice para buscar por usuario
+    __table_args__ = (
+        db.Index('ix_favourite_user_people', 'id_user', 'id_peoples', unique=True),
+        db.Index('ix_favourite_user_planet', 'id_user', 'id_planets', unique=True),
+        db.Index('ix_favourite_user_vehicle', 'id_user', 'id_vehicles', unique=True),
+    )
     
 
     def __repr__(self):
@@ -49,8 +65,28 @@ class Favourite(db.Model):
             "id_planets": self.id_planets,
             "id_vehicles": self.id_vehicles,
         }
+
+    def serialize_with_target(self):
+        # incluye el people/planet/vehicle completo; cargarlos con joinedload para no hacer un query por favorito
+        serialized_fav = self.serialize()
+        if self.id_peoples:
+            serialized_fav["people"] = self.people.serialize()
+        if self.id_planets:
+            serialized_fav["planet"] = self.planet.serialize()
+        if self.id_vehicles:
+            serialized_fav["vehicle"] = self.vehicle.serialize()
+        return serialized_fav
       
 class People(db.Model):
+    PUBLIC_FIELDS = ("id", "name", "height", "mass", "hair_color", "skin_color", "eye_color", "birth_year", "gender")
+    # columnas para filtrar/ordenar en /people (ver catalog.py); ya tienen indice por ser unique
+    FILTER_FIELDS = ("name", "height", "hair_color", "skin_color", "eye_color", "birth_year", "gender")
+
+    # ranking de mas favoritos (ver leaderboard.py)
+    __table_args__ = (
+        db.Index('ix_people_favourite_count', 'favourite_count', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), unique=True, nullable=False)
     height = db.Column(db.Integer, unique=True, nullable=False)
@@ -60,6 +96,8 @@ class People(db.Model):
     eye_color = db.Column(db.String(120), unique=True, nullable=False)
     birth_year = db.Column(db.String(120), unique=True, nullable=False)
     gender = db.Column(db.String(120), unique=True, nullable=False)
+    # cuantos usuarios lo tienen en favoritos; lo mantienen las rutas de favoritos (flask reconcile-favourite-counts lo recalcula)
+    favourite_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     # Relationships 1 a n con Favourite
     favourites = db.relationship('Favourite', backref='people', lazy=True)
@@ -82,6 +120,22 @@ class People(db.Model):
         }
 
 class Vehicle(db.Model):
+    PUBLIC_FIELDS = ("id", "name", "model", "manufacturer", "cost_in_credits", "length", "speed", "crew",
+                     "cargo_capacity", "consumables", "vehicle_class")
+    # columnas para filtrar/ordenar (ver catalog.py), todas con indice
+    FILTER_FIELDS = ("name", "manufacturer", "cost_in_credits", "speed", "crew", "vehicle_class")
+
+    # (columna, id): sirve para el filtro y para paginar por keyset en el mismo indice
+    __table_args__ = (
+        db.Index('ix_vehicle_name', 'name', 'id'),
+        db.Index('ix_vehicle_manufacturer', 'manufacturer', 'id'),
+        db.Index('ix_vehicle_cost_in_credits', 'cost_in_credits', 'id'),
+        db.Index('ix_vehicle_speed', 'speed', 'id'),
+        db.Index('ix_vehicle_crew', 'crew', 'id'),
+        db.Index('ix_vehicle_vehicle_class', 'vehicle_class', 'id'),
+        db.Index('ix_vehicle_favourite_count', 'favourite_count', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(250), nullable=False)
     model = db.Column(db.String(250), nullable=False)
@@ -93,6 +147,7 @@ class Vehicle(db.Model):
     cargo_capacity = db.Column(db.Integer, nullable=False)
     consumables = db.Column(db.String(250), nullable=False)
     vehicle_class = db.Column(db.String(250), nullable=False)
+    favourite_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     # Relationships 1 a n con Favourite
     favourites = db.relationship('Favourite', backref='vehicle', lazy=True)
@@ -116,6 +171,21 @@ class Vehicle(db.Model):
         }
     
 class Planet(db.Model):
+    PUBLIC_FIELDS = ("id", "name", "rotation_period", "orbital_period", "diameter", "climate", "gravity",
+                     "terrain", "surface_water", "population")
+    # columnas para filtrar/ordenar (ver catalog.py), todas con indice
+    FILTER_FIELDS = ("name", "diameter", "climate", "terrain", "population")
+
+    # (columna, id): sirve para el filtro y para paginar por keyset en el mismo indice
+    __table_args__ = (
+        db.Index('ix_planet_name', 'name', 'id'),
+        db.Index('ix_planet_diameter', 'diameter', 'id'),
+        db.Index('ix_planet_climate', 'climate', 'id'),
+        db.Index('ix_planet_terrain', 'terrain', 'id'),
+        db.Index('ix_planet_population', 'population', 'id'),
+        db.Index('ix_planet_favourite_count', 'favourite_count', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(250), nullable=False)
     rotation_period = db.Column(db.Integer, nullable=False)
@@ -126,6 +196,7 @@ class Planet(db.Model):
     terrain = db.Column(db.String(250), nullable=False)
     surface_water = db.Column(db.Integer, nullable=False)
     population = db.Column(db.Integer, nullable=False)
+    favourite_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     # Relationships 1 a n con Favourite
     favourites = db.relationship('Favourite', backref='planet', lazy=True)
@@ -145,4 +216,90 @@ class Planet(db.Model):
             "terrain" : self.terrain,
             "surface_water" : self.surface_water,
             "population" : self.population,
-        }
\ No newline at end of file
+        }
+
+# busqueda por prefijo sin distinguir mayusculas del admin (ver admin.py): indices sobre lower(columna)
+db.Index('ix_user_username_lower', func.lower(User.username))
+db.Index('ix_user_email_lower', func.lower(User.email))
+db.Index('ix_people_name_lower', func.lower(People.name))
+db.Index('ix_vehicle_name_lower', func.lower(Vehicle.name))
+db.Index('ix_planet_name_lower', func.lower(Planet.name))
+
+# tipo de favorito -> (modelo, columna de Favourite que lo referencia)
+FAVOURITE_TARGETS = {
+    "people": (People, "id_peoples"),
+    "planet": (Planet, "id_planets"),
+    "vehicle": (Vehicle, "id_vehicles"),
+}
+
+def favourite_insert_ignore():
+    """INSERT into favourite that silently skips rows already there, in one round trip."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(Favourite).on_conflict_do_nothing()
+    if dialect == "mysql":
+        return insert(Favourite).prefix_with("IGNORE")
+    # sqlite
+    return insert(Favourite).prefix_with("OR IGNORE")
+
+def favourite_target(row):
+    """(fav_type, target id) of a favourite row (dict or Row), by its non-null target column."""
+    values = row if isinstance(row, dict) else row._mapping
+    return next((fav_type, values[column]) for fav_type, (model, column) in FAVOURITE_TARGETS.items()
+                if values[column] is not None)
+
+def insert_favourites(rows):
+    """Inserts favourite rows, skipping the ones the user already has. Returns the targets actually inserted."""
+    conn = db.session.connection()
+    statement = favourite_insert_ignore()
+    if conn.dialect.insert_executemany_returning:
+        # RETURNING solo devuelve las filas insertadas, no las que el indice unico descarto
+        columns = [getattr(Favourite, column) for model, column in FAVOURITE_TARGETS.values()]
+        return [favourite_target(row) for row in conn.execute(statement.returning(*columns), rows)]
+    # sin RETURNING (MySQL): el rowcount de cada fila
+    return [favourite_target(row) for row in rows if conn.execute(statement, row).rowcount == 1]
+
+def delete_favourites(favourite_ids):
+    """Deletes favourites by id. Returns the targets of the rows actually deleted."""
+    conn = db.session.connection()
+    columns = [getattr(Favourite, column) for model, column in FAVOURITE_TARGETS.values()]
+    if conn.dialect.delete_returning:
+        return [favourite_target(row) for row in
+                conn.execute(delete(Favourite).where(Favourite.id.in_(favourite_ids)).returning(*columns))]
+    deleted = []
+    for row in conn.execute(select(Favourite.id, *columns).where(Favourite.id.in_(favourite_ids))).all():
+        if conn.execute(delete(Favourite).where(Favourite.id == row.id)).rowcount == 1:
+            deleted.append(favourite_target(row))
+    return deleted
+
+def add_favourite(user_id, fav_type, target_id):
+    """Inserts the favourite unless the user already has it. Returns True if a row was added."""
+    row = {"name": "Nombre del favorito", "id_user": user_id, "id_peoples": None, "id_planets": None, "id_vehicles": None}
+    row[FAVOURITE_TARGETS[fav_type][1]] = target_id
+    result = db.session.execute(favourite_insert_ignore().values(**row))
+    return result.rowcount == 1
+
+def change_favourite_counts(fav_type, deltas):
+    """Adds deltas ({target id: +n/-n}) to favourite_count in one executemany UPDATE, in the current transaction."""
+    deltas = {target_id: delta for target_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    model = FAVOURITE_TARGETS[fav_type][0]
+    # count = count + n en el mismo UPDATE: no se pierden incrementos con requests concurrentes
+    statement = update(model).where(model.id == bindparam("b_id")) \
+        .values(favourite_count=model.favourite_count + bindparam("b_delta"))
+    # connection(): un executemany simple, no el "bulk update by primary key" del ORM
+    db.session.connection().execute(statement, [{"b_id": target_id, "b_delta": delta} for target_id, delta in deltas.items()])
+    # las lecturas de favourite_count se quedan en el primary despues del commit (ver replica.py)
+    mark_written(db.session, favourite_count_version_key(model.__tablename__))
+
+
+def reconcile_favourite_counts(conn):
+    """Recomputes favourite_count from the favourite table. Returns {fav_type: rows fixed}."""
+    fixed = {}
+    for fav_type, (model, column) in FAVOURITE_TARGETS.items():
+        actual = select(func.count(Favourite.id)).where(getattr(Favourite, column) == model.id).scalar_subquery()
+        # solo las filas que se desviaron, el resto no se reescribe
+        result = conn.execute(update(model).where(model.favourite_count != actual).values(favourite_count=actual))
+        fixed[fav_type] = result.rowcount
+    return fixed
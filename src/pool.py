@@ -0,0 +1,82 @@
+"""
+Connection pool settings from environment variables, and live pool statistics.
+
+    DB_POOL_SIZE            connections kept open per worker process (default 5)
+    DB_MAX_OVERFLOW         extra connections allowed under bursts (default 10)
+    DB_POOL_TIMEOUT         seconds to wait for a free connection before failing (default 30)
+    DB_POOL_RECYCLE         seconds before a connection is replaced (default 1800)
+    DB_POOL_PRE_PING        1/0, test connections on checkout; drops the ones a Postgres restart killed (default 1)
+    DB_STATEMENT_TIMEOUT_MS Postgres statement_timeout per connection (default 0, no limit)
+
+With gunicorn every worker has its own pool: the database sees up to
+workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections.
+"""
+import os
+import threading
+import time
+from sqlalchemy.pool import QueuePool
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a free connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = {"checkouts": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0, "timeouts": 0}
+        self._stats_lock = threading.Lock()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            with self._stats_lock:
+                self.wait_stats["timeouts"] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.wait_stats["checkouts"] += 1
+                self.wait_stats["wait_seconds_total"] += waited
+                self.wait_stats["wait_seconds_max"] = max(self.wait_stats["wait_seconds_max"], waited)
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def engine_options_from_env(database_url):
+    """SQLALCHEMY_ENGINE_OPTIONS for Flask-SQLAlchemy."""
+    if database_url.startswith("sqlite") and ":memory:" in database_url:
+        # SQLite en memoria usa su propio pool de una sola conexion
+        return {}
+    options = {
+        "poolclass": TimedQueuePool,
+        "pool_size": _env_int("DB_POOL_SIZE", 5),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", 10),
+        "pool_timeout": _env_int("DB_POOL_TIMEOUT", 30),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") != "0",
+    }
+    statement_timeout = _env_int("DB_STATEMENT_TIMEOUT_MS", 0)
+    if statement_timeout and database_url.startswith("postgresql"):
+        options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout}"}
+    return options
+
+
+def pool_stats(engine):
+    pool = engine.pool
+    stats = {"pool_class": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+        })
+    if isinstance(pool, TimedQueuePool):
+        with pool._stats_lock:
+            stats.update(pool.wait_stats)
+    return stats
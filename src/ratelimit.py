@@ -0,0 +1,192 @@
+"""
+Token-bucket rate limiting for the unauthenticated and write routes (login, signup, favourites).
+
+Every bucket holds up to `capacity` tokens and refills at capacity/period tokens per second; a
+request takes one token or gets 429 with Retry-After. A check is one dict operation (or one
+Redis round trip), never a query, so a login flood is turned away before it reaches the
+database or the password hash.
+
+Limits are "capacity/seconds", overridable per name with RATE_LIMIT_<NAME>, e.g.
+RATE_LIMIT_LOGIN_IP=20/60. Other settings:
+
+    RATE_LIMIT_ENABLED      1/0 (default 1)
+    RATE_LIMIT_REDIS_URL    shared buckets for every worker (default: per worker, in memory)
+    RATE_LIMIT_MAX_KEYS     buckets kept in memory, least recently used go first (default 100000)
+    RATE_LIMIT_PROXY_HOPS   proxies in front of the app that append to X-Forwarded-For (default 0)
+
+RATE_LIMIT_PROXY_HOPS has to match the deployment: behind a load balancer (Render's is one hop,
+set in render.yml) the default 0 keys every client on the proxy's address, so all of them share
+one bucket. Set it too high and clients can pick their own IP by sending X-Forwarded-For.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import jsonify, request
+
+LIMITS = {
+    "login_ip": "20/60",
+    "login_identity": "5/60",
+    "signup_ip": "5/60",
+    "favourites_ip": "120/60",
+    "favourites_identity": "60/60",
+}
+
+
+def parse_limit(raw):
+    """"20/60" -> (capacity 20, refill rate 20/60 tokens per second)."""
+    capacity, _, period = raw.partition("/")
+    capacity = float(capacity)
+    return capacity, capacity / float(period or 1)
+
+
+class RateLimitBackend:
+    """Interface for bucket stores: consume() must be atomic per key."""
+
+    def consume(self, key, capacity, rate, cost=1):
+        """Returns (allowed, seconds until `cost` tokens are available)."""
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryBackend(RateLimitBackend):
+    """Buckets in a dict of this worker, bounded with LRU eviction (an evicted bucket starts full)."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, rate, cost=1):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+# el bucket entero se calcula dentro de Redis: atomico entre workers, con el reloj del servidor
+_CONSUME_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(retry_after)}
+"""
+
+
+class RedisBackend(RateLimitBackend):
+    """Shared buckets over any redis-py compatible client."""
+
+    def __init__(self, client, prefix="swapi:ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+        self._consume = client.register_script(_CONSUME_SCRIPT)
+
+    def consume(self, key, capacity, rate, cost=1):
+        allowed, retry_after = self._consume(keys=[self.prefix + key], args=[capacity, rate, cost])
+        return bool(allowed), float(retry_after)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+
+def client_ip():
+    hops = int(os.getenv("RATE_LIMIT_PROXY_HOPS", 0))
+    if hops and len(request.access_route) >= hops:
+        # cada proxy de confianza agrega una IP al final de X-Forwarded-For
+        return request.access_route[-hops]
+    return request.remote_addr
+
+
+class RateLimiter:
+    def __init__(self):
+        self.backend = MemoryBackend()
+        self.enabled = True
+        self.limits = {name: parse_limit(raw) for name, raw in LIMITS.items()}
+
+    def init_app(self, app):
+        self.enabled = os.getenv("RATE_LIMIT_ENABLED", "1") != "0"
+        self.limits = {name: parse_limit(os.getenv(f"RATE_LIMIT_{name.upper()}", raw)) for name, raw in LIMITS.items()}
+        redis_url = os.getenv("RATE_LIMIT_REDIS_URL")
+        if redis_url:
+            import redis  # optional, solo con buckets compartidos
+            self.backend = RedisBackend(redis.Redis.from_url(redis_url))
+        else:
+            self.backend = MemoryBackend(int(os.getenv("RATE_LIMIT_MAX_KEYS", 100000)))
+        app.extensions["rate_limiter"] = self
+
+    def check(self, name, identity):
+        """Takes one token from the `name` bucket of `identity`. Returns seconds to wait, or None if allowed."""
+        capacity, rate = self.limits[name]
+        allowed, retry_after = self.backend.consume(f"{name}:{identity}", capacity, rate)
+        return None if allowed else retry_after
+
+    def limit(self, name, key):
+        """Rejects the request with 429 when the `name` bucket of key(**view_args) is empty.
+
+        key returns the identity to limit (client IP, email, user id); None skips the check.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if self.enabled:
+                    identity = key(**kwargs)
+                    if identity is not None:
+                        retry_after = self.check(name, identity)
+                        if retry_after is not None:
+                            response = jsonify({"msg": "Too many requests, try again later"})
+                            response.status_code = 429
+                            response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+                            return response
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
+
+
+limiter = RateLimiter()
+
+
+def by_ip(**view_args):
+    return client_ip()
+
+
+def by_user_id(**view_args):
+    return view_args.get("user_id")
+
+
+def by_login_email(**view_args):
+    request_body = request.get_json(force=True, silent=True)
+    email = request_body.get("email") if isinstance(request_body, dict) else None
+    return email.strip().lower() if isinstance(email, str) and email else None
@@ -0,0 +1,142 @@
+"""
+Read replica routing: the read-only routes (catalog lists and details, users, favourite
+counts and leaderboards) run their SELECTs on REPLICA_DATABASE_URL, everything else on the
+primary (DATABASE_URL).
+
+A read goes to the primary instead when:
+
+- the route isn't marked with @replica.read_only(<tables>);
+- the session already wrote in this request (flush, INSERT/UPDATE/DELETE, or took
+  session.connection() for Core statements): read-after-write;
+- one of the route's tables was written less than REPLICA_MAX_LAG seconds ago, so the next GET
+  of the client that wrote sees it. The write times live in the response cache backend, next
+  to the table versions (cache.invalidate stamps them), so only reads of those tables are
+  pinned and the other routes keep using the replica;
+- the replica is more than REPLICA_MAX_LAG seconds behind or can't be reached.
+
+    REPLICA_DATABASE_URL        read-only copy of the database (default: none, all on the primary)
+    REPLICA_MAX_LAG             seconds of replication lag tolerated (default 5)
+    REPLICA_LAG_CHECK_INTERVAL  seconds between lag checks, per worker (default 5)
+
+The lag is measured on Postgres streaming replicas; on other databases (e.g. two SQLite files
+standing in for primary and replica) a replica that answers counts as 0 behind. With a shared
+cache (CACHE_REDIS_URL) every worker sees the write times, and a response read from the replica
+inside the window is not cached. With the per-worker LRU cache only the worker that wrote sees
+them, like its table versions.
+"""
+import os
+import threading
+import time
+from functools import wraps
+from flask import g, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select, event, text
+from sqlalchemy.exc import SQLAlchemyError
+from cache import cache
+from pool import engine_options_from_env
+
+BIND_KEY = "replica"
+
+# en el primary las funciones de replay devuelven NULL; sin WAL pendiente el atraso es 0
+# aunque el ultimo commit sea viejo (primary sin escrituras)
+_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self.enabled = False
+        self.max_lag = 5.0
+        self.check_interval = 5.0
+        self._lag = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Adds the replica bind; call it before db.init_app (see app.configure)."""
+        self.max_lag = float(os.getenv("REPLICA_MAX_LAG", 5))
+        self.check_interval = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", 5))
+        url = os.getenv("REPLICA_DATABASE_URL")
+        self.enabled = bool(url)
+        if url:
+            url = url.replace("postgres://", "postgresql://")
+            app.config.setdefault("SQLALCHEMY_BINDS", {})[BIND_KEY] = {"url": url, **engine_options_from_env(url)}
+        # las escrituras se recuerdan REPLICA_MAX_LAG segundos (ver Cache.invalidate)
+        cache.write_window = self.max_lag if self.enabled else 0
+        app.extensions["read_replica"] = self
+
+    def read_only(self, *tables):
+        """Lets the SELECTs of this view go to the replica unless one of `tables` (cache version keys) was just written."""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                g.read_replica = tables
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def lag(self, engine):
+        """Replication lag in seconds, checked every check_interval; None if the replica is down."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked_at < self.check_interval:
+                return self._lag
+            # un solo request por intervalo hace el chequeo, los demas usan el valor anterior
+            self._checked_at = now
+        # fuera de Postgres solo se comprueba que la replica conteste
+        query = _LAG_QUERY if engine.dialect.name == "postgresql" else text("SELECT 0")
+        try:
+            with engine.connect() as conn:
+                lag = float(conn.execute(query).scalar())
+        except SQLAlchemyError:
+            lag = None
+        self._lag = lag
+        return lag
+
+    def usable(self, engine, tables=()):
+        if cache.written_within(tables, self.max_lag):
+            return False
+        lag = self.lag(engine)
+        return lag is not None and lag <= self.max_lag
+
+    def status(self, engine):
+        return {"enabled": self.enabled, "lag_seconds": self._lag, "max_lag_seconds": self.max_lag,
+                "usable": self.enabled and self.usable(engine)}
+
+
+replica = ReplicaRouter()
+
+
+class RoutingSession(Session):
+    """db.session: SELECTs of @replica.read_only views on the replica bind, the rest on the primary."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and replica.enabled:
+            if self._flushing or getattr(clause, "is_dml", False):
+                self.info["wrote"] = True
+            elif (isinstance(clause, Select) and not self.info.get("wrote")
+                    and has_request_context() and g.get("read_replica") is not None):
+                engine = self._db.engines[BIND_KEY]
+                if replica.usable(engine, g.read_replica):
+                    # cache.cached no guarda lo leido de la replica si la tabla se acaba de escribir
+                    g.read_from_replica = True
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def connection(self, *args, **kwargs):
+        # SQL Core por la conexion (inserts en bloque, UPDATE de contadores): get_bind no ve el statement
+        if replica.enabled:
+            self.info["wrote"] = True
+        return super().connection(*args, **kwargs)
+
+
+# despues del commit las tablas escritas quedan marcadas en el cache (Cache.invalidate)
+@event.listens_for(RoutingSession, "after_commit")
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_write(session):
+    session.info.pop("wrote", None)
@@ -0,0 +1,53 @@
+"""
+Password hashing for signup/login.
+
+Hashes are werkzeug pbkdf2:sha256 strings. The KDF runs in a bounded thread pool so a burst
+of logins cannot take more than PASSWORD_HASH_THREADS cores of a worker; hashlib releases
+the GIL while it works, so the pool threads really run in parallel.
+"""
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# OWASP 2023 para pbkdf2-sha256; bajar solo para tests/desarrollo
+DEFAULT_ITERATIONS = 600000
+HASH_TIMEOUT_SECONDS = 30
+
+_executor = None
+
+
+def hash_iterations():
+    return int(os.getenv("PASSWORD_HASH_ITERATIONS", DEFAULT_ITERATIONS))
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        threads = int(os.getenv("PASSWORD_HASH_THREADS", os.cpu_count() or 1))
+        _executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="kdf")
+    return _executor
+
+
+def is_hashed(stored):
+    return stored.startswith(("pbkdf2:", "scrypt:")) and "$" in stored
+
+
+def hash_password(password, iterations=None):
+    method = f"pbkdf2:sha256:{iterations or hash_iterations()}"
+    return _pool().submit(generate_password_hash, password, method).result(HASH_TIMEOUT_SECONDS)
+
+
+def verify_password(stored, password):
+    # un JSON puede traer cualquier tipo: 123 o null no son un password
+    if not isinstance(password, str):
+        return False
+    if not is_hashed(stored):
+        # filas antiguas con el password en texto plano
+        return hmac.compare_digest(stored.encode(), password.encode())
+    return _pool().submit(check_password_hash, stored, password).result(HASH_TIMEOUT_SECONDS)
+
+
+def needs_rehash(stored):
+    """True for legacy plaintext rows and for hashes made with another work factor."""
+    return not is_hashed(stored) or not stored.startswith(f"pbkdf2:sha256:{hash_iterations()}$")
@@ -1,4 +1,21 @@
-from flask import jsonify, url_for
+import base64
+import json
+import re
+from flask import jsonify, request, Response, stream_with_context
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import load_only
+from instrumentation import timed
+from models import db
+from json_provider import dumps
+
+# Keyset pagination: las listas se recorren por la primary key (WHERE id > after_id ORDER BY id)
+# o, con ?sort=, por (columnas del sort..., id) usando un cursor opaco ?after=
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+# filas por SELECT cuando se exporta la tabla entera en modo stream
+STREAM_CHUNK_SIZE = 500
+# rango de un BIGINT: un entero mas grande lo rechaza el driver (OverflowError, un 500)
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
 
 class APIException(Exception):
     status_code = 400
@@ -15,20 +32,199 @@ class APIException(Exception):
         rv['message'] = self.message
         return rv
 
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def decode_cursor(token):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except ValueError:
+        raise APIException("after is not a valid cursor", status_code=400)
+    if not isinstance(values, list):
+        raise APIException("after is not a valid cursor", status_code=400)
+    return values
+
+def int_arg(args, name, default):
+    """?name= as an int, `default` when missing; 400 if it isn't an integer or doesn't fit in 64 bits."""
+    raw = args.get(name)
+    if raw is None or raw == '':
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise APIException(f"{name} must be an integer", status_code=400)
+    if value < INT64_MIN or value > INT64_MAX:
+        raise APIException(f"{name} is out of range", status_code=400)
+    return value
+
+def get_page_args(args=None):
+    """Returns (cursor, limit). cursor is None or the sort values of the last row already seen."""
+    args = args if args is not None else request.args
+    limit = int_arg(args, 'limit', DEFAULT_PAGE_LIMIT)
+    if limit < 1 or limit > MAX_PAGE_LIMIT:
+        raise APIException(f"limit must be between 1 and {MAX_PAGE_LIMIT}", status_code=400)
+    if args.get('after'):
+        return decode_cursor(args['after']), limit
+    after_id = int_arg(args, 'after_id', 0)
+    if after_id < 0:
+        raise APIException("after_id must be a positive integer", status_code=400)
+    return [after_id], limit
+
+def get_fields(model, args=None):
+    """Parses ?fields=id,name against model.PUBLIC_FIELDS. None means every field."""
+    raw = (args if args is not None else request.args).get('fields')
+    if not raw:
+        return None
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in model.PUBLIC_FIELDS]
+    if unknown or not fields:
+        raise APIException(f"Unknown fields: {', '.join(unknown)}", status_code=400,
+                           payload={"allowed": list(model.PUBLIC_FIELDS)})
+    return fields
+
+def serialize_fields(item, fields):
+    return {field: getattr(item, field) for field in fields}
+
+def get_one(model, object_id):
+    """Detail lookup that only loads the ?fields= columns. Returns (item, serialize)."""
+    fields = get_fields(model)
+    query = model.query
+    if fields:
+        query = query.options(load_only(*[getattr(model, field) for field in fields]))
+    item = query.filter_by(id=object_id).first()
+    if fields:
+        return item, lambda obj: serialize_fields(obj, fields)
+    return item, lambda obj: obj.serialize()
+
+def wants_stream():
+    return request.args.get('stream', '').lower() in ('1', 'true', 'yes')
+
+def cursor_value(column, value):
+    """A cursor value as the column's Python type; 400 if it can't be one (the cursor comes from the client)."""
+    python_type = column.type.python_type
+    if value is None or isinstance(value, (bool, list, dict)):
+        raise APIException("after is not a valid cursor", status_code=400)
+    if python_type is int and isinstance(value, float) and not value.is_integer():
+        raise APIException("after is not a valid cursor", status_code=400)
+    try:
+        value = python_type(value)
+    except (TypeError, ValueError, OverflowError):
+        raise APIException("after is not a valid cursor", status_code=400)
+    if python_type is int and not INT64_MIN <= value <= INT64_MAX:
+        raise APIException("after is not a valid cursor", status_code=400)
+    return value
+
+def keyset_condition(order, cursor):
+    """WHERE clause for "rows after cursor" in `order` (list of (column, descending)), one OR branch per key."""
+    if len(cursor) != len(order):
+        raise APIException("after cursor does not match the sort", status_code=400)
+    cursor = [cursor_value(column, value) for (column, descending), value in zip(order, cursor)]
+    branches = []
+    for i, (column, descending) in enumerate(order):
+        equal = [order[j][0] == cursor[j] for j in range(i)]
+        step = column < cursor[i] if descending else column > cursor[i]
+        branches.append(and_(*equal, step))
+    return or_(*branches)
+
+def keyset_page(model, cursor, limit, query=None, order=None):
+    """Returns (rows, next_cursor) walking an index in `order` (primary key by default), one page at a time."""
+    query = query if query is not None else model.query
+    order = order or [(model.id, False)]
+    if cursor is not None:
+        query = query.filter(keyset_condition(order, cursor))
+    # pedimos una fila extra para saber si hay otra pagina sin hacer COUNT(*)
+    query = query.order_by(*[column.desc() if descending else column.asc() for column, descending in order])
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = [getattr(rows[-1], column.key) for column, descending in order]
+    return rows, next_cursor
+
+def iter_keyset_chunks(model, chunk_size=STREAM_CHUNK_SIZE, query=None, order=None):
+    cursor = None
+    while True:
+        rows, cursor = keyset_page(model, cursor, chunk_size, query=query, order=order)
+        if rows:
+            yield rows
+        if cursor is None:
+            return
+
+def stream_json_array(model, serialize=None, chunk_size=STREAM_CHUNK_SIZE, query=None, order=None):
+    """Streams the whole table as a JSON array, serializing chunk by chunk so memory stays flat."""
+    serialize = serialize or (lambda item: item.serialize())
+
+    def generate():
+        yield "["
+        first = True
+        for rows in iter_keyset_chunks(model, chunk_size, query=query, order=order):
+            chunk = ",".join(dumps(serialize(item)) for item in rows)
+            yield chunk if first else "," + chunk
+            first = False
+        yield "]"
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+def row_columns(model, fields, order):
+    """Columns to SELECT for `fields`: the fields first, then id and the sort columns the cursor needs."""
+    columns = [getattr(model, field) for field in fields]
+    extra = [model.id] + [column for column, descending in order]
+    seen = set(fields)
+    for column in extra:
+        if column.key not in seen:
+            seen.add(column.key)
+            columns.append(column)
+    return columns
+
+def row_serializer(fields):
+    # las filas traen primero los fields, en orden: zip corta antes de las columnas extra
+    return lambda row: dict(zip(fields, row))
+
+def list_response(model, msg, conditions=None, order=None):
+    """Shared body for the list endpoints: ?after_id=&limit= pages, ?stream=true exports everything,
+    ?fields=id,name picks the columns. `conditions` (WHERE clauses) and `order` come from catalog.py."""
+    # sin ?sort= paginamos por id con after_id; con sort el cursor es opaco (?after=)
+    by_id = order is None
+    order = order or [(model.id, False)]
+    # siempre filas planas con solo las columnas publicas (o las de ?fields=): sin objetos del ORM
+    fields = get_fields(model) or list(model.PUBLIC_FIELDS)
+    query = db.session.query(*row_columns(model, fields, order))
+    serialize = row_serializer(fields)
+    if conditions:
+        query = query.filter(*conditions)
+
+    if wants_stream():
+        return stream_json_array(model, serialize, query=query, order=order)
+
+    cursor, limit = get_page_args()
+    if not by_id and not request.args.get('after'):
+        cursor = None
+    rows, next_cursor = keyset_page(model, cursor, limit, query=query, order=order)
+    with timed("serialize"):
+        results = [serialize(item) for item in rows]
+    response_body = { "msg": msg,
+                     "results": results}
+    if by_id:
+        response_body["next_after_id"] = next_cursor[0] if next_cursor else None
+    else:
+        response_body["next_after"] = encode_cursor(next_cursor) if next_cursor else None
+
+    return jsonify(response_body), 200
+
 def has_no_empty_params(rule):
     defaults = rule.defaults if rule.defaults is not None else ()
     arguments = rule.arguments if rule.arguments is not None else ()
     return len(defaults) >= len(arguments)
 
-def generate_sitemap(app):
-    links = ['/admin/']
+def generate_sitemap(app, admin=True):
+    """Sitemap HTML, built once by create_app() (rules without parameters have a fixed URL, no url_for needed)."""
+    links = ['/admin/'] if admin else []
     for rule in app.url_map.iter_rules():
         # Filter out rules we can't navigate to in a browser
         # and rules that require parameters
-        if "GET" in rule.methods and has_no_empty_params(rule):
-            url = url_for(rule.endpoint, **(rule.defaults or {}))
-            if "/admin/" not in url:
-                links.append(url)
+        if "GET" in rule.methods and has_no_empty_params(rule) and rule.endpoint != "static":
+            if not rule.rule.startswith("/admin"):
+                links.append(rule.rule)
 
     links_html = "".join(["<li><a href='" + y + "'>" + y + "</a></li>" for y in links])
     return """
@@ -39,3 +235,23 @@ def generate_sitemap(app):
         <p>Start working on your proyect by following the <a href="https://start.4geeksacademy.com/starters/flask" target="_blank">Quick Start</a></p>
         <p>Remember to specify a real endpoint path like: </p>
         <ul style="text-align: left;">"""+links_html+"</ul></div>"
+
+# <int:user_id> -> ("int", "user_id"), <name> -> ("", "name")
+RULE_PARAM = re.compile(r"<(?:(\w+)(?:\([^)]*\))?:)?(\w+)>")
+
+def route_catalog(app, auth_endpoints=()):
+    """[{path, endpoint, methods, params, auth_required}] for every API rule, for GET /routes.
+    auth_endpoints are the endpoints behind @jwt_required() (marked with @route(..., auth=True))."""
+    catalog = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+        if rule.endpoint == "static" or rule.rule.startswith("/admin"):
+            continue
+        catalog.append({
+            "path": rule.rule,
+            "endpoint": rule.endpoint,
+            "methods": sorted(rule.methods - {"HEAD", "OPTIONS"}),
+            "params": [{"name": name, "type": converter or "string"}
+                       for converter, name in RULE_PARAM.findall(rule.rule)],
+            "auth_required": rule.endpoint in auth_endpoints,
+        })
+    return catalog
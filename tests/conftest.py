@@ -0,0 +1,86 @@
+"""
+Shared fixtures: every test gets a fresh app (create_app) on its own SQLite file, with the
+module-level caches (responses, JWT users, leaderboards) emptied.
+"""
+import os
+import re
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+# antes de importar app: su create_app() a nivel de modulo lee estas variables
+_TMP = tempfile.mkdtemp(prefix="swapi-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP}/import.db"
+os.environ.setdefault("ADMIN_MODE", "off")
+os.environ.setdefault("PASSWORD_HASH_ITERATIONS", "1000")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+from app import create_app  # noqa: E402
+from auth import identity_cache  # noqa: E402
+from leaderboard import leaderboards  # noqa: E402
+from models import db, User, People, Planet, Vehicle  # noqa: E402
+
+QUERIES_PATTERN = re.compile(r'desc="(\d+) queries"')
+
+
+@pytest.fixture
+def database_url(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path}/primary.db"
+    monkeypatch.setenv("DATABASE_URL", url)
+    return url
+
+
+@pytest.fixture
+def app(database_url):
+    app = create_app(admin_mode="off")
+    with app.app_context():
+        # solo el primary: db.metadatas guarda el bind "replica" de otros tests (ver test_replica.py)
+        db.create_all(bind_key=None)
+    identity_cache.clear()
+    for board in leaderboards.values():
+        board.reset()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def seed_catalog(app, size):
+    """`size` people, planets and vehicles with ids 1..size."""
+    with app.app_context():
+        for i in range(1, size + 1):
+            db.session.add(People(name=f"Person {i}", height=i, mass=f"{i}kg", hair_color=f"hair {i}",
+                                  skin_color=f"skin {i}", eye_color=f"eye {i}", birth_year=f"{i}BBY", gender=f"gender {i}"))
+            db.session.add(Planet(name=f"Planet {i}", rotation_period=24, orbital_period=365, diameter=1000 + i,
+                                  climate="arid", gravity=1.0, terrain="desert", surface_water=1, population=i))
+            db.session.add(Vehicle(name=f"Vehicle {i}", model="model", manufacturer="maker", cost_in_credits=i,
+                                   length=1.5, speed=i, crew=1, cargo_capacity=i, consumables="1 month",
+                                   vehicle_class="wheeled"))
+        db.session.commit()
+
+
+def create_user(app, user_id, password="plain"):
+    with app.app_context():
+        db.session.add(User(id=user_id, username=f"user{user_id}", email=f"user{user_id}@test.local",
+                            password=password, is_active=True))
+        db.session.commit()
+
+
+def auth_headers(app, user_id):
+    with app.app_context():
+        return {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+
+
+def query_count(response):
+    """SQL statements the request ran, from the Server-Timing header (see instrumentation.py)."""
+    return int(QUERIES_PATTERN.search(response.headers["Server-Timing"]).group(1))
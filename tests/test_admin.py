@@ -0,0 +1,90 @@
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from conftest import seed_catalog
+from models import db, People
+
+
+@pytest.fixture
+def admin_app(database_url):
+    app = create_app(admin_mode="eager")
+    with app.app_context():
+        db.create_all(bind_key=None)
+    seed_catalog(app, 5)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def listed_people(response):
+    assert response.status_code == 200
+    return re.findall(r"Person \d+|Luke Skywalker", response.get_data(as_text=True))
+
+
+def test_lazy_admin_runs_on_the_api_engines(database_url):
+    app = create_app(admin_mode="lazy")
+    with app.app_context():
+        db.create_all(bind_key=None)
+        api_engine = db.engine
+    client = app.test_client()
+
+    assert client.get("/people").status_code == 200
+    stats = client.get("/admin/pool/").json
+
+    admin_app = app.wsgi_app.mounts["/admin"]._app
+    with admin_app.app_context():
+        assert db.engine is api_engine
+    # la conexion que uso /people vuelve al pool que muestra el admin
+    assert stats["checked_in"] == api_engine.pool.checkedin() >= 1
+    with app.app_context():
+        db.session.remove()
+        api_engine.dispose()
+
+
+def test_admin_wsgi_does_not_build_the_api(database_url):
+    src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+    check = "import sys, admin_wsgi; assert 'app' not in sys.modules, 'admin_wsgi imported app.py'"
+    result = subprocess.run([sys.executable, "-c", check], cwd=src, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_admin_search_is_one_case_insensitive_prefix(admin_app):
+    with admin_app.app_context():
+        db.session.get(People, 5).name = "Luke Skywalker"
+        db.session.commit()
+    client = admin_app.test_client()
+
+    assert listed_people(client.get("/admin/people/?search=Person")) == ["Person 1", "Person 2", "Person 3", "Person 4"]
+    assert listed_people(client.get("/admin/people/?search=person%201")) == ["Person 1"]
+    assert listed_people(client.get("/admin/people/?search=%20luke%20sky%20")) == ["Luke Skywalker"]
+    assert listed_people(client.get("/admin/people/?search=Skywalker")) == []
+
+
+def test_admin_pages_by_keyset_after_the_first_page(admin_app):
+    client = admin_app.test_client()
+    assert listed_people(client.get("/admin/people/?page_size=2")) == ["Person 1", "Person 2"]
+
+    statements = []
+    with admin_app.app_context():
+        engine = db.engine
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert listed_people(client.get("/admin/people/?page_size=2&page=1")) == ["Person 3", "Person 4"]
+        # otro orden, sin la pagina anterior en cache: OFFSET una vez
+        assert listed_people(client.get("/admin/people/?page_size=2&page=2&sort=0")) == ["Person 5"]
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    # SQLite siempre escribe LIMIT ? OFFSET ?, la diferencia es el WHERE del keyset
+    people_selects = [statement for statement in statements if "FROM people" in statement]
+    assert "people.id >" in people_selects[0]
+    assert "people.id >" not in people_selects[-1]
@@ -0,0 +1,74 @@
+import asyncio
+import json
+from datetime import timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token, create_refresh_token
+from conftest import seed_catalog
+from utils import encode_cursor
+
+pytest.importorskip("aiosqlite")
+pytest.importorskip("asgiref")
+
+
+@pytest.fixture
+def asgi_app(app, monkeypatch):
+    """asgi.application over the test's app and database, not the module-level app it imports."""
+    from asgiref.wsgi import WsgiToAsgi
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    import asgi
+    engine = create_async_engine(asgi.async_database_url(app.config["SQLALCHEMY_DATABASE_URI"]))
+    monkeypatch.setattr(asgi, "flask_app", app)
+    monkeypatch.setattr(asgi, "engine", engine)
+    monkeypatch.setattr(asgi, "Session", async_sessionmaker(engine, expire_on_commit=False))
+    monkeypatch.setattr(asgi, "wsgi_fallback", WsgiToAsgi(app))
+    yield app, asgi.application
+    asyncio.run(engine.dispose())
+
+
+def asgi_get(application, path, query_string=b"", headers=()):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": query_string,
+             "headers": list(headers), "http_version": "1.1", "scheme": "http", "root_path": "",
+             "server": ("test", 80), "client": ("127.0.0.1", 1234)}
+    asyncio.run(application(scope, receive, send))
+    body = b"".join(message.get("body", b"") for message in messages if message["type"] == "http.response.body")
+    return messages[0]["status"], json.loads(body) if body else None
+
+
+def test_asgi_token_errors_match_flask(asgi_app):
+    flask_app, application = asgi_app
+    with flask_app.app_context():
+        tokens = [create_access_token(identity="1", expires_delta=timedelta(seconds=-1)),
+                  create_refresh_token(identity="1"),
+                  "not-a-token"]
+    client = flask_app.test_client()
+
+    statuses = []
+    for token in tokens:
+        flask_response = client.get("/users/1/favourites", headers={"Authorization": f"Bearer {token}"})
+        status, body = asgi_get(application, "/users/1/favourites",
+                                headers=[(b"authorization", f"Bearer {token}".encode())])
+        assert (status, body) == (flask_response.status_code, flask_response.json)
+        statuses.append(status)
+    assert statuses == [401, 422, 422]
+
+
+def test_asgi_rejects_bad_cursors(asgi_app):
+    app, application = asgi_app
+    seed_catalog(app, 3)
+
+    status, body = asgi_get(application, "/people", b"limit=2")
+    assert (status, [person["id"] for person in body["results"]]) == (200, [1, 2])
+    assert asgi_get(application, "/people", f"after_id={body['next_after_id']}".encode())[1]["results"][0]["id"] == 3
+
+    bad_sorted = encode_cursor([[], []])
+    assert asgi_get(application, "/people", f"sort=height&after={bad_sorted}".encode())[0] == 400
+    assert asgi_get(application, "/people", f"after={encode_cursor(['x'])}".encode())[0] == 400
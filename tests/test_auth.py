@@ -0,0 +1,26 @@
+from conftest import create_user
+
+
+def test_login_with_non_string_password_is_rejected(app, client):
+    create_user(app, 1, password="secret")
+
+    for password in (123, None, ["secret"], {"p": 1}):
+        response = client.post("/login", json={"email": "user1@test.local", "password": password})
+        assert response.status_code == 200
+        assert response.json == {"msg": "Incorrect login"}
+
+
+def test_login_rehashes_legacy_password(app, client):
+    create_user(app, 1, password="secret")
+
+    assert "access_token" in client.post("/login", json={"email": "user1@test.local", "password": "secret"}).json
+    assert "access_token" in client.post("/login", json={"email": "user1@test.local", "password": "secret"}).json
+    assert client.post("/login", json={"email": "user1@test.local", "password": "wrong"}).json == {"msg": "Incorrect login"}
+
+
+def test_signup_with_non_string_password_is_rejected(client):
+    response = client.post("/signup", json={"username": "new", "email": "new@test.local",
+                                            "password": 123, "is_active": True})
+
+    assert response.status_code == 400
+    assert response.json["message"] == "password must be a string"
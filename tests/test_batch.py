@@ -0,0 +1,88 @@
+from conftest import auth_headers, create_user, seed_catalog
+from models import db, Favourite, People, Planet
+
+
+def batch(client, app, user_id, operations, as_user=None):
+    return client.post(f"/users/{user_id}/favourites/batch", json={"operations": operations},
+                       headers=auth_headers(app, as_user or user_id))
+
+
+def test_batch_requires_the_owner_token(app, client):
+    seed_catalog(app, 3)
+    create_user(app, 1)
+    create_user(app, 2)
+    operations = [{"action": "add", "type": "people", "id": 1}]
+
+    assert client.post("/users/1/favourites/batch", json={"operations": operations}).status_code == 401
+    assert batch(client, app, 1, operations, as_user=2).status_code == 403
+    with app.app_context():
+        assert Favourite.query.count() == 0
+
+
+def test_batch_rejects_boolean_ids(app, client):
+    seed_catalog(app, 3)
+    create_user(app, 1)
+
+    response = batch(client, app, 1, [{"action": "add", "type": "people", "id": True}])
+
+    assert response.json["results"][0]["status"] == "invalid"
+    assert response.json["added"] == 0
+
+
+def test_batch_adds_and_removes(app, client):
+    seed_catalog(app, 3)
+    create_user(app, 1)
+
+    added = batch(client, app, 1, [{"action": "add", "type": "people", "id": 1},
+                                   {"action": "add", "type": "planet", "id": 2},
+                                   {"action": "add", "type": "vehicle", "id": 9}])
+    assert [result["status"] for result in added.json["results"]] == ["added", "added", "not_found"]
+
+    removed = batch(client, app, 1, [{"action": "remove", "type": "people", "id": 1},
+                                     {"action": "add", "type": "planet", "id": 2}])
+    assert [result["status"] for result in removed.json["results"]] == ["removed", "already_exists"]
+    with app.app_context():
+        assert [(fav.id_peoples, fav.id_planets) for fav in db.session.query(Favourite)] == [(None, 2)]
+
+
+def test_batch_counts_only_rows_actually_written(app, client, monkeypatch):
+    import app as api
+    seed_catalog(app, 3)
+    create_user(app, 1)
+    batch(client, app, 1, [{"action": "add", "type": "planet", "id": 2}])
+    real_insert, real_delete = api.insert_favourites, api.delete_favourites
+
+    def insert_after_concurrent_add(rows):
+        # otro request inserta el mismo favorito entre el SELECT del batch y su INSERT
+        db.session.add(Favourite(name="otro request", id_user=1, id_peoples=1))
+        db.session.flush()
+        return real_insert(rows)
+
+    def delete_after_concurrent_remove(favourite_ids):
+        db.session.query(Favourite).filter(Favourite.id.in_(favourite_ids)).delete()
+        return real_delete(favourite_ids)
+
+    monkeypatch.setattr(api, "insert_favourites", insert_after_concurrent_add)
+    monkeypatch.setattr(api, "delete_favourites", delete_after_concurrent_remove)
+    response = batch(client, app, 1, [{"action": "add", "type": "people", "id": 1},
+                                      {"action": "remove", "type": "planet", "id": 2}])
+
+    assert [result["status"] for result in response.json["results"]] == ["already_exists", "not_in_favourites"]
+    assert (response.json["added"], response.json["removed"]) == (0, 0)
+    with app.app_context():
+        # el favorito de "otro request" no sumo en favourite_count, y el DELETE ajeno no resto
+        assert db.session.get(People, 1).favourite_count == 0
+        assert db.session.get(Planet, 2).favourite_count == 1
+
+
+def test_batch_caps_the_number_of_operations(app, client):
+    import app as api
+    seed_catalog(app, 1)
+    create_user(app, 1)
+    operations = [{"action": "add", "type": "people", "id": 1}] * (api.MAX_BATCH_OPERATIONS + 1)
+
+    response = batch(client, app, 1, operations)
+
+    assert response.status_code == 400
+    with app.app_context():
+        assert Favourite.query.count() == 0
@@ -0,0 +1,73 @@
+import pytest
+from cache import cache, RedisCache
+from conftest import query_count, seed_catalog
+from models import db, People
+
+
+@pytest.fixture(params=["lru", "redis"])
+def cached_app(request, app):
+    if request.param == "redis":
+        fakeredis = pytest.importorskip("fakeredis")
+        # Redis local de mentira: mismo protocolo que el backend compartido entre workers
+        cache.backend = RedisCache(fakeredis.FakeRedis())
+    seed_catalog(app, 3)
+    return app
+
+
+def rename_person(app, person_id, name):
+    with app.app_context():
+        db.session.get(People, person_id).name = name
+        db.session.commit()
+
+
+def test_hit_runs_no_sql(cached_app):
+    client = cached_app.test_client()
+    first = client.get("/people/1")
+    second = client.get("/people/1")
+
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert query_count(second) == 0
+    assert second.json == first.json
+
+
+def test_commit_invalidates_cached_responses(cached_app):
+    client = cached_app.test_client()
+    assert client.get("/people/1").json["results"]["name"] == "Person 1"
+    assert client.get("/people").headers["X-Cache"] == "MISS"
+
+    rename_person(cached_app, 1, "Renamed")
+
+    detail = client.get("/people/1")
+    assert detail.headers["X-Cache"] == "MISS"
+    assert detail.json["results"]["name"] == "Renamed"
+    assert client.get("/people").json["results"][0]["name"] == "Renamed"
+    # otras tablas no se invalidan
+    client.get("/planets/1")
+    rename_person(cached_app, 2, "Other")
+    assert client.get("/planets/1").headers["X-Cache"] == "HIT"
+
+
+def test_rollback_keeps_cached_responses(cached_app):
+    client = cached_app.test_client()
+    client.get("/people/1")
+    with cached_app.app_context():
+        db.session.get(People, 1).name = "Never committed"
+        db.session.flush()
+        db.session.rollback()
+
+    assert client.get("/people/1").headers["X-Cache"] == "HIT"
+
+
+def test_etag_changes_on_commit(cached_app):
+    client = cached_app.test_client()
+    etag = client.get("/people/1").headers["ETag"]
+
+    not_modified = client.get("/people/1", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert query_count(not_modified) == 0
+
+    rename_person(cached_app, 1, "Renamed")
+    changed = client.get("/people/1", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
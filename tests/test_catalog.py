@@ -0,0 +1,69 @@
+import base64
+import json
+
+import pytest
+from conftest import seed_catalog
+
+BAD_CURSORS = [[[], []], ["tall", 1], [True, 1], [None, 1], [1.5, 1], [{"a": 1}, 1], [2 ** 70, 1]]
+
+
+def raw_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+@pytest.mark.parametrize("query", ["limit=abc", "limit=0", "limit=1.5", "after_id=x", "after_id=-1",
+                                   f"after_id={2 ** 70}", f"limit={2 ** 70}"])
+def test_page_args_must_be_valid_integers(app, client, query):
+    seed_catalog(app, 3)
+
+    for url in ("/people", "/users"):
+        response = client.get(f"{url}?{query}")
+        assert response.status_code == 400, (url, response.json)
+
+
+def test_page_args_default_when_missing_or_empty(app, client):
+    seed_catalog(app, 3)
+
+    response = client.get("/people?limit=&after_id=")
+    assert [person["id"] for person in response.json["results"]] == [1, 2, 3]
+    assert client.get("/people?limit=2&after_id=1").json["next_after_id"] is None
+
+
+@pytest.mark.parametrize("query", [f"population__gte={2 ** 70}", f"population={-2 ** 70}", "diameter__lt=big"])
+def test_filter_values_must_fit_the_column(app, client, query):
+    seed_catalog(app, 3)
+
+    assert client.get(f"/planets?{query}").status_code == 400
+
+
+@pytest.mark.parametrize("values", BAD_CURSORS)
+def test_cursor_values_must_match_the_sort_columns(app, client, values):
+    seed_catalog(app, 3)
+
+    response = client.get(f"/people?sort=height&after={raw_cursor(values)}")
+
+    assert response.status_code == 400
+    assert response.json["message"] == "after is not a valid cursor"
+
+
+def test_sorted_pages_follow_the_cursor(app, client):
+    seed_catalog(app, 5)
+
+    first = client.get("/planets?sort=-population&limit=2").json
+    second = client.get(f"/planets?sort=-population&limit=2&after={first['next_after']}").json
+
+    assert [planet["population"] for planet in first["results"]] == [5, 4]
+    assert [planet["population"] for planet in second["results"]] == [3, 2]
+    # un cursor con numeros como string (otro cliente JSON) se convierte al tipo de la columna
+    assert client.get(f"/planets?sort=-population&limit=2&after={raw_cursor(['4', '4'])}").json["results"] == second["results"]
+
+
+@pytest.mark.parametrize("prefix", ["\U0010ffff", "Person \U0010ffff", "퟿", "Person 1"])
+def test_prefix_search_accepts_any_last_character(app, client, prefix):
+    seed_catalog(app, 12)
+
+    response = client.get("/people", query_string={"name__prefix": prefix})
+
+    assert response.status_code == 200
+    names = [person["name"] for person in response.json["results"]]
+    assert names == (["Person 1", "Person 10", "Person 11", "Person 12"] if prefix == "Person 1" else [])
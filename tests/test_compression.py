@@ -0,0 +1,76 @@
+import gzip
+import json
+
+import pytest
+import compression
+from compression import choose_encoding, settings
+from conftest import seed_catalog
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("identity", None),
+    ("", None),
+    ("deflate, gzip;q=0.5", "gzip"),
+])
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header) == expected
+
+
+def test_choose_encoding_prefers_brotli_unless_refused():
+    pytest.importorskip("brotli")
+    assert choose_encoding("gzip, br") == "br"
+    assert choose_encoding("gzip, br;q=0") == "gzip"
+    # la calidad del cliente pesa mas que la preferencia del servidor
+    assert choose_encoding("br;q=0.5, gzip") == "gzip"
+
+
+def test_small_bodies_go_out_uncompressed(client, monkeypatch):
+    monkeypatch.setattr(settings, "min_size", 1024)
+
+    response = client.get("/healthz", headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+
+def test_gzip_body_decodes_to_the_same_json(app, client, monkeypatch):
+    monkeypatch.setattr(settings, "min_size", 0)
+    seed_catalog(app, 3)
+    plain = client.get("/people/1")
+
+    response = client.get("/people/1", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(response.get_data())) == plain.json
+
+
+def test_cached_responses_are_compressed_once(app, client, monkeypatch):
+    monkeypatch.setattr(settings, "min_size", 0)
+    seed_catalog(app, 3)
+    calls = []
+    original = compression.compress
+    monkeypatch.setattr(compression, "compress", lambda data, encoding: calls.append(encoding) or original(data, encoding))
+
+    first = client.get("/people", headers={"Accept-Encoding": "gzip"})
+    second = client.get("/people", headers={"Accept-Encoding": "gzip"})
+
+    assert (first.headers["X-Cache"], second.headers["X-Cache"]) == ("MISS", "HIT")
+    assert second.get_data() == first.get_data()
+    assert calls == ["gzip"]
+
+
+def test_compressed_etag_and_304(app, client, monkeypatch):
+    monkeypatch.setattr(settings, "min_size", 0)
+    seed_catalog(app, 3)
+    plain_etag = client.get("/people/1").headers["ETag"]
+
+    response = client.get("/people/1", headers={"Accept-Encoding": "gzip"})
+    etag = response.headers["ETag"]
+    assert etag == plain_etag[:-1] + '-gzip"'
+
+    not_modified = client.get("/people/1", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == etag
+    assert "Accept-Encoding" in not_modified.headers["Vary"]
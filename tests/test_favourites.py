@@ -0,0 +1,43 @@
+from conftest import auth_headers, create_user, query_count, seed_catalog
+from models import db, Favourite
+
+
+def add_favourites(app, user_id, count):
+    """`count` favourites spread over people, planets and vehicles."""
+    columns = ("id_peoples", "id_planets", "id_vehicles")
+    with app.app_context():
+        for i in range(count):
+            db.session.add(Favourite(name="fav", id_user=user_id, **{columns[i % 3]: i // 3 + 1}))
+        db.session.commit()
+
+
+def test_user_favourites_query_count_does_not_grow_with_favourites(app, client):
+    seed_catalog(app, 20)
+    create_user(app, 1)
+    create_user(app, 2)
+    add_favourites(app, 1, 1)
+    add_favourites(app, 2, 45)
+
+    counts = {}
+    for user_id in (1, 2):
+        headers = auth_headers(app, user_id)
+        cold = client.get(f"/users/{user_id}/favourites", headers=headers)
+        warm = client.get(f"/users/{user_id}/favourites", headers=headers)
+        assert cold.status_code == warm.status_code == 200
+        counts[user_id] = (query_count(cold), query_count(warm))
+
+    assert len(client.get("/users/2/favourites", headers=auth_headers(app, 2)).json["results"]) == 45
+    # usuario (solo sin cache) + favoritos con sus targets en un JOIN, sin un SELECT por favorito
+    assert counts[1] == counts[2] == (2, 1)
+
+
+def test_user_favourites_include_targets(app, client):
+    seed_catalog(app, 3)
+    create_user(app, 1)
+    add_favourites(app, 1, 3)
+
+    results = client.get("/users/1/favourites", headers=auth_headers(app, 1)).json["results"]
+
+    assert [result["people"]["name"] for result in results if "people" in result] == ["Person 1"]
+    assert [result["planet"]["name"] for result in results if "planet" in result] == ["Planet 1"]
+    assert [result["vehicle"]["name"] for result in results if "vehicle" in result] == ["Vehicle 1"]
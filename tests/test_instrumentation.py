@@ -0,0 +1,32 @@
+import re
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from models import db
+
+
+def test_failed_queries_do_not_leak_timers(app):
+    with app.app_context():
+        conn = db.session.connection()
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+        conn.execute(text("SELECT 1"))
+        assert conn.info.get("query_start") == []
+
+
+def test_serialize_time_includes_json_encoding(app, client, monkeypatch):
+    for name in ("dumps", "_orjson_dumps"):
+        original = getattr(app.json, name)
+
+        def slow(obj, *args, original=original, **kwargs):
+            time.sleep(0.02)
+            return original(obj, *args, **kwargs)
+        monkeypatch.setattr(app.json, name, slow)
+
+    response = client.get("/healthz")
+
+    serialize_ms = float(re.search(r"serialize;dur=([\d.]+)", response.headers["Server-Timing"]).group(1))
+    assert serialize_ms >= 20
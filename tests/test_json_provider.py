@@ -0,0 +1,48 @@
+import datetime
+import decimal
+import json
+import uuid
+
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+import json_provider
+from json_provider import FastJSONProvider, dumps
+
+VALUES = {
+    "name": "Tatooine",
+    "created": datetime.datetime(2024, 1, 2, 3, 4, 5),
+    "day": datetime.date(2024, 1, 2),
+    "aware": datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+    "price": decimal.Decimal("10.50"),
+    "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "nested": {"b": 1, "a": [2, {"z": None, "y": True}]},
+    "afloat": 1.5,
+}
+
+
+def flask_default(obj):
+    return DefaultJSONProvider(Flask(__name__)).dumps(obj)
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_provider_matches_flask_default(monkeypatch, use_orjson):
+    if use_orjson:
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(json_provider, "orjson", None)
+    provider = FastJSONProvider(Flask(__name__))
+
+    assert json.loads(provider.dumps(VALUES)) == json.loads(flask_default(VALUES))
+    assert provider.dumps(VALUES).replace(" ", "") == flask_default(VALUES).replace(" ", "")
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_module_dumps_sorts_keys_like_jsonify(monkeypatch, use_orjson):
+    if use_orjson:
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(json_provider, "orjson", None)
+
+    assert dumps(VALUES) == json.dumps(json.loads(flask_default(VALUES)), sort_keys=True, separators=(",", ":"))
+    assert '"created":"Tue, 02 Jan 2024 03:04:05 GMT"' in dumps(VALUES)
@@ -0,0 +1,75 @@
+from conftest import auth_headers, create_user, seed_catalog
+from leaderboard import TopK
+from models import People
+
+
+def loaded_board(entries, size=3):
+    """TopK over `entries` [(count, id, name)] instead of the database; counts how often it loads."""
+    board = TopK(People, size, ttl=60)
+    board.loads = 0
+
+    def load():
+        board.loads += 1
+        return list(entries)
+    board._load = load
+    board.top(size)
+    return board
+
+
+def test_full_board_keeps_the_top_entries():
+    board = loaded_board([(5, 1, "a"), (3, 2, "b"), (2, 3, "c")])
+
+    board.record(4, "d", 4)
+    assert board.top(3) == [(5, 1, "a"), (4, 4, "d"), (3, 2, "b")]
+    # por debajo del ultimo con la lista llena: no entra
+    board.record(5, "e", 1)
+    # empate con el ultimo: gana el id mas bajo, que ya esta
+    board.record(6, "f", 3)
+    assert board.top(3) == [(5, 1, "a"), (4, 4, "d"), (3, 2, "b")]
+    assert board.loads == 1
+
+
+def test_entry_falling_below_the_bottom_reloads_the_board():
+    board = loaded_board([(5, 1, "a"), (3, 2, "b"), (2, 3, "c")])
+
+    # baja pero sigue por encima del ultimo: se reordena en memoria
+    board.record(1, "a", 2)
+    assert board.top(3) == [(3, 2, "b"), (2, 1, "a"), (2, 3, "c")]
+    assert board.loads == 1
+
+    # cae por debajo del ultimo: alguien de afuera puede merecer el lugar
+    board.record(2, "b", 1)
+    board.top(3)
+    assert board.loads == 2
+
+
+def test_count_reaching_zero_leaves_the_board():
+    board = loaded_board([(5, 1, "a"), (3, 2, "b")])
+
+    board.record(2, "b", 0)
+    assert board.top(3) == [(5, 1, "a")]
+    assert board.loads == 1
+    board.record(7, "g", 0)
+    assert board.top(3) == [(5, 1, "a")]
+
+    full = loaded_board([(5, 1, "a"), (3, 2, "b"), (2, 3, "c")])
+    full.record(1, "a", 0)
+    full.top(3)
+    assert full.loads == 2
+
+
+def test_favourite_count_route_follows_the_writes(app, client):
+    seed_catalog(app, 2)
+    for user_id in (1, 2):
+        create_user(app, user_id)
+        client.post(f"/users/{user_id}/favourites/people/2", headers=auth_headers(app, user_id))
+
+    response = client.get("/people/2/favourite-count")
+    assert response.json["results"] == {"id": 2, "name": "Person 2", "favourite_count": 2}
+    assert client.get("/people/leaderboard").json["results"] == [{"id": 2, "name": "Person 2", "favourite_count": 2}]
+
+    client.delete("/users/1/favourites/people/2", headers=auth_headers(app, 1))
+    client.delete("/users/2/favourites/people/2", headers=auth_headers(app, 2))
+    assert client.get("/people/2/favourite-count").json["results"]["favourite_count"] == 0
+    assert client.get("/people/leaderboard").json["results"] == []
+    assert client.get("/people/9/favourite-count").status_code == 404
@@ -0,0 +1,12 @@
+import threading
+
+from app import create_app
+
+
+def test_apps_share_one_log_listener(database_url):
+    listeners = {id(create_app(admin_mode="off").extensions["log_listener"]) for _ in range(3)}
+    names = [thread.name for thread in threading.enumerate()]
+
+    assert len(listeners) == 1
+    create_app(admin_mode="off")
+    assert len(threading.enumerate()) == len(names)
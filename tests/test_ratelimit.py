@@ -0,0 +1,84 @@
+import pytest
+import ratelimit
+from conftest import create_user
+from ratelimit import MemoryBackend, RedisBackend, client_ip, limiter, parse_limit
+
+
+def test_client_ip_trusts_only_the_configured_hops(app, monkeypatch):
+    # el cliente manda su propio X-Forwarded-For, el proxy agrega la IP real al final
+    headers = {"X-Forwarded-For": "1.1.1.1, 203.0.113.7"}
+    environ = {"REMOTE_ADDR": "10.0.0.1"}
+
+    with app.test_request_context(headers=headers, environ_base=environ):
+        assert client_ip() == "10.0.0.1"
+    monkeypatch.setenv("RATE_LIMIT_PROXY_HOPS", "1")
+    with app.test_request_context(headers=headers, environ_base=environ):
+        assert client_ip() == "203.0.113.7"
+
+
+def test_memory_bucket_empties_and_refills(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: clock[0])
+    backend = MemoryBackend()
+    capacity, rate = parse_limit("2/60")
+
+    assert [backend.consume("login:a", capacity, rate)[0] for _ in range(3)] == [True, True, False]
+    assert backend.consume("login:a", capacity, rate)[1] == pytest.approx(30)
+    # otra clave tiene su propio bucket
+    assert backend.consume("login:b", capacity, rate)[0]
+
+    clock[0] += 30
+    assert backend.consume("login:a", capacity, rate) == (True, 0.0)
+    assert not backend.consume("login:a", capacity, rate)[0]
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_keys=2)
+    capacity, rate = parse_limit("1/60")
+    backend.consume("a", capacity, rate)
+    backend.consume("b", capacity, rate)
+    backend.consume("c", capacity, rate)
+
+    # "a" salio del LRU: vuelve con el bucket lleno
+    assert backend.consume("a", capacity, rate)[0]
+    assert not backend.consume("c", capacity, rate)[0]
+
+
+def test_redis_backend_shares_buckets_between_workers():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # los scripts Lua de fakeredis
+    server = fakeredis.FakeServer()
+    workers = [RedisBackend(fakeredis.FakeRedis(server=server)) for _ in range(2)]
+    capacity, rate = parse_limit("2/60")
+
+    assert workers[0].consume("login:a", capacity, rate)[0]
+    assert workers[1].consume("login:a", capacity, rate)[0]
+    allowed, retry_after = workers[0].consume("login:a", capacity, rate)
+    assert not allowed and retry_after == pytest.approx(30, abs=0.5)
+
+    workers[1].clear()
+    assert workers[0].consume("login:a", capacity, rate)[0]
+
+
+@pytest.fixture
+def limited_app(app, monkeypatch):
+    monkeypatch.setattr(limiter, "enabled", True)
+    monkeypatch.setattr(limiter, "backend", MemoryBackend())
+    monkeypatch.setattr(limiter, "limits", {**limiter.limits, "login_identity": parse_limit("2/60")})
+    return app
+
+
+def test_login_limit_answers_429_with_retry_after(limited_app):
+    create_user(limited_app, 1)
+    client = limited_app.test_client()
+    # mayusculas y espacios no abren otro bucket para la misma cuenta
+    for email in ("user1@test.local", " User1@Test.LOCAL "):
+        assert client.post("/login", json={"email": email, "password": "wrong"}).status_code != 429
+
+    response = client.post("/login", json={"email": "USER1@test.local", "password": "wrong"})
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "30"
+    assert response.json == {"msg": "Too many requests, try again later"}
+    # otra cuenta tiene su propio bucket
+    assert client.post("/login", json={"email": "user2@test.local", "password": "wrong"}).status_code == 404
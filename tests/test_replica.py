@@ -0,0 +1,126 @@
+import shutil
+
+import pytest
+from flask import g
+from sqlalchemy import select, update
+
+from app import create_app
+from cache import cache, RedisCache
+from conftest import auth_headers, create_user, seed_catalog
+from models import db, People, Planet
+from replica import replica, BIND_KEY
+
+
+def reset_replica():
+    """Forgets the lag check and the recent writes, as if REPLICA_MAX_LAG had passed."""
+    replica._checked_at = float("-inf")
+    replica._lag = None
+    # las marcas written_at:<tabla> viven en el backend del cache
+    cache.backend.clear()
+
+
+@pytest.fixture
+def replica_app(database_url, tmp_path, monkeypatch):
+    """Primary and replica on two SQLite files; person 1 and planet 1 are named after the file that answers."""
+    monkeypatch.setenv("REPLICA_DATABASE_URL", f"sqlite:///{tmp_path}/replica.db")
+    app = create_app(admin_mode="off")
+    with app.app_context():
+        db.create_all()
+    seed_catalog(app, 2)
+    create_user(app, 1)
+    # la "replicacion": la replica arranca como copia del primary
+    shutil.copy(tmp_path / "primary.db", tmp_path / "replica.db")
+    with app.app_context():
+        with db.engines[BIND_KEY].begin() as conn:
+            for model in (People, Planet):
+                conn.execute(update(model).where(model.id == 1).values(name="replica"))
+        for model in (People, Planet):
+            db.session.execute(update(model).where(model.id == 1).values(name="primary"))
+        db.session.commit()
+    reset_replica()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    reset_replica()
+
+
+def answered_by(client, url="/people/1/favourite-count"):
+    return client.get(url).json["results"]["name"]
+
+
+def test_read_only_routes_read_from_the_replica(replica_app):
+    client = replica_app.test_client()
+    assert answered_by(client) == "replica"
+    # el usuario 2 solo existe en el primary: la ruta read_only no lo ve, la de escritura si
+    create_user(replica_app, 2)
+    reset_replica()
+    assert client.get("/users/2").status_code == 404
+    assert client.post("/users/2/favourites/people/1").status_code == 201
+
+
+def test_read_after_write_in_the_same_request_uses_the_primary(replica_app):
+    with replica_app.test_request_context():
+        g.read_replica = ("people",)
+        assert db.session.scalar(select(People.name).where(People.id == 1)) == "replica"
+        db.session.get(People, 2).name = "renamed"
+        db.session.flush()
+        assert db.session.scalar(select(People.name).where(People.id == 1)) == "primary"
+        db.session.rollback()
+
+
+def test_only_reads_of_written_tables_stay_on_the_primary(replica_app):
+    client = replica_app.test_client()
+    # el batch escribe con SQL Core por session.connection(), sin pasar por el flush del ORM
+    response = client.post("/users/1/favourites/batch", headers=auth_headers(replica_app, 1),
+                           json={"operations": [{"action": "add", "type": "people", "id": 1}]})
+    assert response.json["added"] == 1
+
+    result = client.get("/people/1/favourite-count").json["results"]
+    assert (result["name"], result["favourite_count"]) == ("primary", 1)
+    # los planetas no se escribieron: siguen en la replica
+    assert answered_by(client, "/planets/1/favourite-count") == "replica"
+
+    reset_replica()
+    assert answered_by(client) == "replica"
+
+
+def test_replica_reads_inside_the_write_window_are_not_cached(replica_app, monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    cache.backend = RedisCache(fakeredis.FakeRedis())
+    client = replica_app.test_client()
+    # otro worker escribe people justo despues de que este decidiera leer de la replica
+    monkeypatch.setattr(replica, "usable", lambda engine, tables=(): True)
+    cache.invalidate("people")
+
+    assert client.get("/people/1").headers["X-Cache"] == "MISS"
+    assert client.get("/people/1").headers["X-Cache"] == "MISS"
+
+    cache.backend.client.delete("swapi:written_at:people")
+    assert client.get("/people/1").headers["X-Cache"] == "MISS"
+    assert client.get("/people/1").headers["X-Cache"] == "HIT"
+
+
+def test_lagging_replica_falls_back_to_the_primary(replica_app, monkeypatch):
+    client = replica_app.test_client()
+    monkeypatch.setattr(replica, "lag", lambda engine: replica.max_lag + 1)
+    assert answered_by(client) == "primary"
+
+
+def test_unreachable_replica_falls_back_to_the_primary(database_url, tmp_path, monkeypatch):
+    monkeypatch.setenv("REPLICA_DATABASE_URL", f"sqlite:///{tmp_path}/missing/replica.db")
+    app = create_app(admin_mode="off")
+    with app.app_context():
+        db.create_all(bind_key=None)
+    seed_catalog(app, 1)
+    reset_replica()
+
+    response = app.test_client().get("/people/1/favourite-count")
+    assert response.json["results"]["name"] == "Person 1"
+    with app.app_context():
+        assert replica.status(db.engines[BIND_KEY])["usable"] is False
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    reset_replica()
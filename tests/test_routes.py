@@ -0,0 +1,44 @@
+from sqlalchemy.exc import OperationalError
+from models import db
+
+
+def test_routes_lists_every_api_route_with_its_auth(app, client):
+    response = client.get("/routes")
+
+    assert response.status_code == 200
+    routes = {route["endpoint"]: route for route in response.json["results"]}
+    assert routes["get_user_favourite"]["params"] == [{"name": "user_id", "type": "int"}]
+    assert {endpoint for endpoint, route in routes.items() if route["auth_required"]} == {
+        "get_user_favourite", "batch_user_favourites", "protected"}
+    assert not any(route["path"].startswith("/admin") for route in routes.values())
+
+    # cada ruta marcada auth=True de verdad rechaza un request sin token
+    for route in routes.values():
+        if route["auth_required"]:
+            path = route["path"].replace("<int:user_id>", "1")
+            assert client.open(path, method=route["methods"][0]).status_code == 401, path
+
+
+def test_routes_answers_if_none_match_with_304(client):
+    etag = client.get("/routes").headers["ETag"]
+
+    assert client.get("/routes", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_healthz(client):
+    response = client.get("/healthz")
+    assert (response.status_code, response.json) == (200, {"status": "ok"})
+
+
+def test_readyz_checks_the_database(client, monkeypatch):
+    assert client.get("/readyz").json["database"] == "ok"
+
+    def broken_execute(*args, **kwargs):
+        raise OperationalError("SELECT 1", {}, Exception("connection refused"))
+
+    # db.session es el scoped_session: el execute de la vista pasa por aqui
+    monkeypatch.setattr(db.session, "execute", broken_execute)
+    response = client.get("/readyz")
+
+    assert response.status_code == 503
+    assert response.json == {"status": "unavailable", "database": "OperationalError"}